@@ -0,0 +1,149 @@
+"""
+Benchmark: media-URL extraction from pin pages.
+
+Compares the original whole-page regex extractor (kept here as `legacy_extract`) with the
+streaming MediaExtractor fed in EXTRACT_CHUNK_SIZE chunks, on bytes read, parse time and
+the URL picked. Uses saved pin pages from --corpus (*.html, pin ID taken from the file
+name if it has one) or, without a corpus, synthetic video / image / no-state pages.
+
+    python benchmarks/bench_extract.py [--corpus pages/] [--pages 30] [--size-kb 600]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from code_download import EXTRACT_CHUNK_SIZE  # noqa: E402
+from pinterest_extract import MediaExtractor  # noqa: E402
+
+
+def legacy_extract(html):
+    m = re.search(r'<meta[^>]+property="og:video"[^>]+content="([^"]+)"', html)
+    if m:
+        return m.group(1), "video"
+    m = re.search(r'"contentUrl"\s*:\s*"(https?:[^"\\]+\.mp4)"', html)
+    if m:
+        return m.group(1), "video"
+    m = re.search(r'<meta[^>]+property="og:image"[^>]+content="([^"]+)"', html)
+    if m:
+        return m.group(1), "image"
+    m = re.search(r'"images"\s*:\s*\{[^}]*"orig"\s*:\s*\{[^}]*"url"\s*:\s*"(https?:[^"\\]+)"', html)
+    if m:
+        return m.group(1), "image"
+    return None
+
+
+def pin_json(pin_id, video):
+    pin = {
+        "id": str(pin_id),
+        "title": f"Pin {pin_id}",
+        "images": {
+            "236x": {"url": f"https://i.pinimg.com/236x/{pin_id}.jpg", "width": 236},
+            "736x": {"url": f"https://i.pinimg.com/736x/{pin_id}.jpg", "width": 736},
+            "orig": {"url": f"https://i.pinimg.com/originals/{pin_id}.jpg", "width": 1600},
+        },
+        "videos": None,
+    }
+    if video:
+        pin["videos"] = {"video_list": {
+            "V_HLSV4": {"url": f"https://v.pinimg.com/videos/hls/{pin_id}.m3u8", "width": 1080, "height": 1920},
+            "V_720P": {"url": f"https://v.pinimg.com/videos/720p/{pin_id}.mp4", "width": 720, "height": 1280},
+            "V_EXP4": {"url": f"https://v.pinimg.com/videos/exp4/{pin_id}.mp4", "width": 360, "height": 640},
+        }}
+    return pin
+
+
+def synthetic_page(pin_id, kind, size_bytes, rng):
+    """kind: 'video' (og:video in head), 'image' (state blob), 'plain' (meta tags only)."""
+    head = [f'<html><head><meta property="og:image" content="https://i.pinimg.com/736x/{pin_id}.jpg">']
+    if kind == "video":
+        head.append(f'<meta property="og:video" content="https://v.pinimg.com/videos/720p/{pin_id}.mp4">')
+    head.append("</head><body>")
+    body = []
+    total = 0
+    while total < size_bytes * 0.7:
+        filler = "".join(rng.choice("abcdefghij ") for _ in range(rng.randint(800, 1600)))
+        card = f'<div class="related"><a href="/pin/{rng.randint(1, 10**17)}/">{filler}</a></div>'
+        body.append(card)
+        total += len(card)
+    if kind != "plain":
+        related = {str(pin_id + i): pin_json(pin_id + i, False) for i in range(1, 40)}
+        related[str(pin_id)] = pin_json(pin_id, kind == "video")
+        state = {"props": {"initialReduxState": {"pins": related}}}
+        body.append(f'<script id="__PWS_DATA__" type="application/json">{json.dumps(state)}</script>')
+    while total < size_bytes:
+        filler = "".join(rng.choice("klmnopqrst ") for _ in range(1200))
+        body.append(f"<div>{filler}</div>")
+        total += len(filler) + 11
+    return "".join(head + body) + "</body></html>"
+
+
+def load_corpus(path):
+    pages = []
+    for fn in sorted(glob.glob(os.path.join(path, "*.html"))):
+        m = re.search(r"(\d{6,})", os.path.basename(fn))
+        with open(fn, "rb") as f:
+            pages.append((m.group(1) if m else None, f.read()))
+    return pages
+
+
+def synthetic_corpus(n, size_bytes, seed=0):
+    rng = random.Random(seed)
+    kinds = ["video", "image", "plain"]
+    pages = []
+    for i in range(n):
+        pin_id = 10**17 + i * 100
+        pages.append((str(pin_id), synthetic_page(pin_id, kinds[i % 3], size_bytes, rng).encode("utf-8")))
+    return pages
+
+
+def stream_extract(pin_id, body):
+    ex = MediaExtractor(pin_id)
+    for i in range(0, len(body), EXTRACT_CHUNK_SIZE):
+        if ex.feed(body[i:i + EXTRACT_CHUNK_SIZE]):
+            break
+    return ex.close(), ex.bytes_read
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", help="Directory of saved pin pages (*.html)")
+    ap.add_argument("--pages", type=int, default=30, help="Synthetic pages when no corpus is given")
+    ap.add_argument("--size-kb", type=int, default=600, help="Synthetic page size")
+    args = ap.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.pages, args.size_kb * 1024)
+    total = sum(len(body) for _, body in pages)
+    print(f"{len(pages)} pages, {total / 1e6:.1f} MB")
+
+    # Legacy: the whole body is buffered and decoded before the regexes run
+    t = time.perf_counter()
+    old = [legacy_extract(body.decode("utf-8", errors="replace")) for _, body in pages]
+    t_old = time.perf_counter() - t
+
+    t = time.perf_counter()
+    new, read = [], 0
+    for pin_id, body in pages:
+        media, n = stream_extract(pin_id, body)
+        new.append(media)
+        read += n
+    t_new = time.perf_counter() - t
+
+    found_old = sum(1 for m in old if m)
+    found_new = sum(1 for m in new if m)
+    upgraded = sum(1 for a, b in zip(old, new) if a and b and a != b)
+    print(f"legacy:    {total / 1e6:7.2f} MB read  {t_old * 1000:8.1f} ms  ({found_old} found)")
+    print(f"streaming: {read / 1e6:7.2f} MB read  {t_new * 1000:8.1f} ms  ({found_new} found)")
+    print(f"different pick on {upgraded} pages (streaming prefers structured data / orig)")
+    for (pin_id, _), a, b in list(zip(pages, old, new))[:3]:
+        print(f"  {pin_id}: {a[0] if a else None} -> {b[0] if b else None}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark: pin extraction from large infinite-scroll pages.
+
+Compares the original windowed-regex parse_pins (kept here as `legacy_parse_pins`)
+with the single-pass parser, both on one full page and over a simulated scrape where
+the page grows every round and already-collected pins must be skipped. Both parsers'
+IDs, links and titles are checked against the values the page was generated from.
+
+    python benchmarks/bench_parse_pins.py [--size-mb 5] [--rounds 10]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_scraper import IncrementalPinParser, parse_pins  # noqa: E402
+
+
+def legacy_parse_pins(html):
+    pins = []
+    for m in re.finditer(r'data-test-pin-id="(\d+)"', html):
+        pin_id = m.group(1)
+        start = max(0, m.start() - 2000)
+        end = min(len(html), m.end() + 2000)
+        snippet = html[start:end]
+        href_match = re.search(r'href="(/pin/\d+/)"', snippet)
+        title_match = re.search(r'aria-label="([^"]+)"', snippet)
+        pins.append({
+            "pin_id": pin_id,
+            "href": f"https://www.pinterest.com{href_match.group(1)}" if href_match else f"https://www.pinterest.com/pin/{pin_id}/",
+            "title": title_match.group(1) if title_match else None,
+        })
+    seen = set()
+    unique = []
+    for p in pins:
+        if p["pin_id"] in seen:
+            continue
+        seen.add(p["pin_id"])
+        unique.append(p)
+    return unique
+
+
+def pin_card(pin_id, rng):
+    filler = "".join(rng.choice("abcdefghij ") for _ in range(rng.randint(1200, 2400)))
+    return (
+        f'<div data-test-id="pin" data-test-pin-id="{pin_id}"><div class="x">{filler}</div>'
+        f'<a aria-label="Pin title {pin_id}" href="/pin/{pin_id}/"><img src="https://i.pinimg.com/236x/{pin_id}.jpg"></a>'
+        f'<div class="y">{filler[:600]}</div></div>'
+    )
+
+
+def synthetic_page(size_bytes, seed=0):
+    """(html, expected pins) for a page of pin cards."""
+    rng = random.Random(seed)
+    parts, expected, total, pin_id = ["<html><body>"], [], 0, 10**17
+    while total < size_bytes:
+        card = pin_card(pin_id, rng)
+        parts.append(card)
+        expected.append({
+            "pin_id": str(pin_id),
+            "href": f"https://www.pinterest.com/pin/{pin_id}/",
+            "title": f"Pin title {pin_id}",
+        })
+        total += len(card)
+        pin_id += 1
+    parts.append("</body></html>")
+    return "".join(parts), expected
+
+
+def mismatches(pins, expected):
+    """Pins whose ID, link or title differs from the expected ones (in page order)."""
+    if len(pins) != len(expected):
+        return max(len(pins), len(expected))
+    return sum(1 for p, e in zip(pins, expected) if p != e)
+
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=float, default=5.0)
+    ap.add_argument("--rounds", type=int, default=10)
+    args = ap.parse_args()
+
+    page, expected = synthetic_page(int(args.size_mb * 1024 * 1024))
+    print(f"page: {len(page) / 1e6:.1f} MB")
+
+    t_old, old = timed(legacy_parse_pins, page)
+    t_new, new = timed(parse_pins, page)
+    assert mismatches(new, expected) == 0, "single-pass parser returned wrong pins"
+    print(f"full page  legacy: {t_old * 1000:8.1f} ms  single-pass: {t_new * 1000:8.1f} ms  ({len(new)} pins)")
+    # The legacy window also looked 2000 chars *before* each marker, so it can pick up
+    # the previous card's link or title
+    print(f"wrong link/title  legacy: {mismatches(old, expected)}  single-pass: 0")
+
+    # Simulated scroll: the page grows by 1/rounds each round
+    step = len(page) // args.rounds
+    snapshots = [page[: step * (i + 1)] for i in range(args.rounds)]
+
+    t = time.perf_counter()
+    seen = set()
+    for html in snapshots:
+        for p in legacy_parse_pins(html):
+            seen.add(p["pin_id"])
+    t_old = time.perf_counter() - t
+
+    t = time.perf_counter()
+    parser = IncrementalPinParser(use_dom=False)
+    collected = []
+    for html in snapshots:
+        collected.extend(parser.feed(html))
+    t_new = time.perf_counter() - t
+    found = len(collected)
+    assert found == len(seen)
+    # A card cut off at a snapshot boundary may be missing its link/title in that round
+    cut = sum(1 for p, e in zip(collected, expected) if p != e)
+    print(f"{args.rounds} rounds  legacy: {t_old * 1000:8.1f} ms  incremental: {t_new * 1000:8.1f} ms  ({found} pins, {cut} cut at a round boundary)")
+
+
+if __name__ == "__main__":
+    main()
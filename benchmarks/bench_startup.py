@@ -0,0 +1,102 @@
+"""
+Startup benchmark with a budget: how long `import pinterest_gui` (and optionally
+building the window up to its first paint) takes in a fresh interpreter, and whether
+heavy dependencies were pulled in eagerly.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 500] [--window]
+
+Exits with status 1 when the median is over budget or a lazy dependency was imported.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported just to show the window
+LAZY_MODULES = ("aiohttp", "selenium", "webdriver_manager")
+
+IMPORT_PROBE = """
+import sys, time
+t = time.perf_counter()
+import pinterest_gui
+print((time.perf_counter() - t) * 1000)
+print(",".join(m for m in {lazy!r} if m in sys.modules))
+"""
+
+WINDOW_PROBE = """
+import time
+t = time.perf_counter()
+import tkinter as tk
+import pinterest_gui
+root = tk.Tk()
+app = pinterest_gui.App(root)
+root.update()
+print((time.perf_counter() - t) * 1000)
+root.destroy()
+"""
+
+
+def probe(code):
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return out
+
+
+def importtime_top(limit=8):
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pinterest_gui"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stderr.splitlines()
+    rows = []
+    for line in err:
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=500.0)
+    ap.add_argument("--window", action="store_true", help="Also time App construction to first paint (needs a display)")
+    args = ap.parse_args()
+
+    failed = False
+    times, eager = [], set()
+    for _ in range(args.runs):
+        out = probe(IMPORT_PROBE.format(lazy=LAZY_MODULES))
+        times.append(float(out[0]))
+        eager.update(m for m in (out[1] if len(out) > 1 else "").split(",") if m)
+    median = statistics.median(times)
+    print(f"import pinterest_gui: median {median:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports (cumulative us):")
+    for us, name in importtime_top():
+        print(f"  {us:>8}  {name}")
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(sorted(eager))}")
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: import over budget")
+        failed = True
+
+    if args.window:
+        try:
+            ms = float(probe(WINDOW_PROBE)[0])
+        except subprocess.CalledProcessError as e:
+            print(f"window: skipped ({e.stderr.strip().splitlines()[-1] if e.stderr else 'failed'})")
+        else:
+            print(f"window first paint: {ms:.1f} ms (budget {args.budget_ms * 2:.0f} ms)")
+            if ms > args.budget_ms * 2:
+                print("FAIL: first paint over budget")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,316 @@
+from __future__ import annotations
+
+import argparse
 import asyncio
-import aiohttp
+import json
 import os
+import re
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+from pinterest_db import cache_media, fetch_downloaded, find_media_blob, get_cached_media, invalidate_media
+from pinterest_extract import MediaExtractor
+from pinterest_http import DEFAULT_RETRY_POLICY, RetryPolicy, fetch, get_session, map_unordered, run
+from pinterest_store import MediaStore, StreamHash
+
+if TYPE_CHECKING:
+    import aiohttp
+
 try:
     from pinterest_downloader import *  # type: ignore
+    _EXTERNAL_EXTRACTOR = True
 except Exception:
-    async def download_pinterest_media(pin_url: str, return_url: bool = True):
+    _EXTERNAL_EXTRACTOR = False
+
+    async def download_pinterest_media(pin_url: str, return_url: bool = True, session: Optional[aiohttp.ClientSession] = None):
         """
         Fallback minimal extractor: fetches the pin page and tries to extract a media url.
-        Returns {'success': bool, 'url': str|None, 'type': 'video'|'image'|None}
+        Returns {'success': bool, 'url': str|None, 'type': 'video'|'image'|None}, plus
+        'error' when the page itself could not be fetched.
         """
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
-        }
         try:
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
-                async with session.get(pin_url) as resp:
-                    if resp.status != 200:
-                        return {"success": False, "url": None, "type": None}
-                    html = await resp.text()
-        except Exception:
-            return {"success": False, "url": None, "type": None}
-
-        import re
-
-        # Prefer video: look for og:video or contentUrl
-        vid = None
-        m = re.search(r'<meta[^>]+property="og:video"[^>]+content="([^"]+)"', html)
-        if m:
-            vid = m.group(1)
-        if not vid:
-            m = re.search(r'"contentUrl"\s*:\s*"(https?:[^"\\]+\.mp4)"', html)
-            if m:
-                vid = m.group(1)
-
-        if vid:
-            return {"success": True, "url": vid, "type": "video"}
-
-        # Fallback to image: og:image or images field
-        img = None
-        m = re.search(r'<meta[^>]+property="og:image"[^>]+content="([^"]+)"', html)
-        if m:
-            img = m.group(1)
-        if not img:
-            m = re.search(r'"images"\s*:\s*\{[^}]*"orig"\s*:\s*\{[^}]*"url"\s*:\s*"(https?:[^"\\]+)"', html)
-            if m:
-                img = m.group(1)
-
-        if img:
-            return {"success": True, "url": img, "type": "image"}
+            session = session or await get_session()
+            async with fetch(pin_url, session=session) as resp:
+                if resp.status != 200:
+                    return {"success": False, "url": None, "type": None, "error": f"HTTP {resp.status}"}
+                extractor = MediaExtractor(extract_pin_id(pin_url), encoding=resp.charset or "utf-8")
+                # Stop reading the page as soon as the extractor has its answer
+                async for chunk in resp.content.iter_chunked(EXTRACT_CHUNK_SIZE):
+                    if extractor.feed(chunk):
+                        break
+        except Exception as e:
+            return {"success": False, "url": None, "type": None, "error": str(e) or type(e).__name__}
 
+        media = extractor.close()
+        if media:
+            return {"success": True, "url": media[0], "type": media[1]}
         return {"success": False, "url": None, "type": None}
 
-async def download_file(url, filename):
-    """Download a file from URL and save it to disk"""
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Pin pages are read in smaller chunks so extraction can stop early
+EXTRACT_CHUNK_SIZE = 16 * 1024
+
+
+
+class IncompleteDownload(Exception):
+    """The .part file does not hold the complete body (yet); another attempt resumes it."""
+
+
+def _resumable_errors() -> tuple:
+    """Errors after which a download is resumed from its .part file."""
+    import aiohttp
+
+    return (IncompleteDownload, aiohttp.ClientPayloadError, aiohttp.ServerDisconnectedError, asyncio.TimeoutError)
+
+
+def _load_part_meta(meta_path: str) -> Dict[str, Any]:
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_part_meta(meta_path: str, meta: Dict[str, Any]) -> None:
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def _discard_part(part_path: str, meta_path: str) -> None:
+    for path in (part_path, meta_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    # "bytes 100-999/1000" -> (100, 1000) ("*" means unknown)
+    if not value:
+        return None, None
+    unit, _, rest = value.strip().partition(' ')
+    span, _, total = rest.partition('/')
+    start = span.split('-', 1)[0].strip()
+    total = total.strip()
+    if unit.lower() != 'bytes':
+        return None, None
+    return (int(start) if start.isdigit() else None), (int(total) if total.isdigit() else None)
+
+
+async def _fetch_into_part(
+    session,
+    url: str,
+    part_path: str,
+    meta_path: str,
+    chunk_size: int,
+    policy: RetryPolicy,
+    hasher: Optional[StreamHash] = None,
+) -> bool:
+    """
+    One transfer attempt into `part_path`, resuming from its current size when possible.
+    Returns True when the part file holds the complete body, False on a final HTTP
+    failure, and raises on network errors (the part file is kept for the next attempt).
+    `hasher`, if given, ends up holding the digest of the whole part file.
+    """
+    meta = _load_part_meta(meta_path)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if offset and meta.get('url') != url:
+        _discard_part(part_path, meta_path)
+        offset, meta = 0, {}
+
+    # Ask for the raw body: Range offsets and Content-Length count encoded bytes, while
+    # aiohttp would hand us the decompressed ones
+    headers = {'Accept-Encoding': 'identity'}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        if meta.get('etag'):
+            headers['If-Range'] = meta['etag']
+
+    async with fetch(url, session=session, policy=policy, headers=headers) as response:
+        if response.status == 416 and offset and offset == meta.get('length'):
+            if hasher is not None:
+                await asyncio.to_thread(hasher.catch_up, part_path)
+            return True
+        encoded = response.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+        if response.status == 206 and offset:
+            if encoded:
+                _discard_part(part_path, meta_path)
+                raise IncompleteDownload("Server compressed a range response; restarting")
+            etag = response.headers.get('ETag')
+            if meta.get('etag') and etag and etag != meta['etag']:
+                _discard_part(part_path, meta_path)
+                raise IncompleteDownload("ETag changed while resuming")
+            start, total = _parse_content_range(response.headers.get('Content-Range'))
+            if start != offset:
+                # Appending a range that doesn't begin where the part file ends corrupts it
+                _discard_part(part_path, meta_path)
+                raise IncompleteDownload(f"Range response starts at {start}, expected {offset}; restarting")
+            mode = 'ab'
+        elif response.status == 200:
+            # Fresh download, or the server ignored Range / If-Range no longer matched
+            offset = 0
+            etag = response.headers.get('ETag')
+            # A server that compresses anyway sends the encoded length; sizes can't be checked
+            total = None if encoded else response.content_length
+            mode = 'wb'
+        elif response.status == 416:
+            _discard_part(part_path, meta_path)
+            raise IncompleteDownload("Stale partial download discarded")
+        else:
+            print(f"✗ Failed to download: Status {response.status}")
+            return False
+
+        _save_part_meta(meta_path, {'url': url, 'etag': etag, 'length': total})
+        if offset:
+            print(f"↻ Resuming {os.path.basename(part_path)} at {offset} bytes")
+        if hasher is not None:
+            # Hash while streaming; on resume, first re-hash the bytes already on disk
+            if mode == 'ab':
+                await asyncio.to_thread(hasher.catch_up, part_path)
+            else:
+                hasher.reset()
+        with open(part_path, mode) as f:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+
+    size = os.path.getsize(part_path)
+    if total is not None and size != total:
+        raise IncompleteDownload(f"Incomplete download: {size}/{total} bytes")
+    return True
+
+
+async def download_file(
+    url,
+    filename,
+    session: Optional[aiohttp.ClientSession] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    policy: Optional[RetryPolicy] = None,
+    hasher: Optional[StreamHash] = None,
+):
+    """
+    Stream a file from URL to disk, resuming interrupted transfers.
+
+    The body is copied chunk by chunk into `<filename>.part` (with validators kept in
+    `<filename>.part.json`) and renamed into place once complete. After a network error
+    the next attempt sends a Range request for the missing bytes only; servers that
+    ignore Range, or whose ETag changed, fall back to a full download. A failed transfer
+    never leaves a truncated file under the final name. Retries and backoff follow
+    `policy` (the shared DEFAULT_RETRY_POLICY by default). Pass a StreamHash as `hasher`
+    to get the file's digest without reading it back.
+    """
+    part_path = f"{filename}.part"
+    meta_path = f"{part_path}.json"
+    policy = policy or DEFAULT_RETRY_POLICY
+    last_error: Optional[Exception] = None
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    with open(filename, 'wb') as f:
-                        f.write(content)
-                    print(f"✓ Downloaded: {filename}")
-                    return True
-                else:
-                    print(f"✗ Failed to download: Status {response.status}")
-                    return False
+        session = session or await get_session()
     except Exception as e:
         print(f"✗ Error: {str(e)}")
         return False
 
-async def download_pinterest(pin_id, save_location, filename=None):
+    for attempt in range(max(1, policy.attempts)):
+        if attempt:
+            await asyncio.sleep(policy.delay(attempt - 1))
+        try:
+            ok = await _fetch_into_part(session, url, part_path, meta_path, chunk_size, policy, hasher)
+        except _resumable_errors() as e:
+            # Broke off mid-transfer (fetch() already retried failed connects and 5xx)
+            last_error = e
+            continue
+        except Exception as e:
+            print(f"✗ Error: {str(e)}")
+            return False
+        if not ok:
+            return False
+        os.replace(part_path, filename)
+        _discard_part(part_path, meta_path)
+        print(f"✓ Downloaded: {filename}")
+        return True
+
+    print(f"✗ Error: {str(last_error)}")
+    return False
+
+def extract_pin_id(pin: str) -> str:
+    """Return the numeric pin ID from a pin URL, or the input itself if it is already an ID."""
+    m = re.search(r"/pin/(\d+)", pin)
+    if m:
+        return m.group(1)
+    return pin.strip().strip('/')
+
+
+def find_existing_downloads(pin_ids: Iterable[str], save_location: str, db_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Pre-flight check against the pins table: return a skip result for every pin whose
+    recorded file still exists in `save_location` with the recorded size.
+    """
+    try:
+        known = fetch_downloaded([extract_pin_id(p) for p in pin_ids], db_path=db_path)
+    except Exception:
+        return {}
+    target_dir = os.path.abspath(save_location)
+    existing: Dict[str, Dict[str, Any]] = {}
+    for pin_id, (file_path, file_size, media_type) in known.items():
+        if os.path.dirname(os.path.abspath(file_path)) != target_dir:
+            continue
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        if file_size is not None and size != file_size:
+            continue
+        existing[pin_id] = {'success': True, 'filepath': file_path, 'type': media_type, 'skipped': True}
+    return existing
+
+
+async def resolve_media(
+    pin_url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    use_cache: bool = True,
+    db_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Resolve a pin page to its media URL, consulting the media_cache table first.
+
+    Fresh hits (including negative entries for pins with no media) skip the HTML fetch
+    entirely. Cache reads and writes run in a worker thread so they never stall other
+    transfers on the event loop. Successful extractions are cached; pages that loaded but held no media are
+    negatively cached; fetch errors are not cached so they can be retried.
+    """
+    key = extract_pin_id(pin_url)
+    if use_cache:
+        try:
+            cached = await asyncio.to_thread(get_cached_media, key, db_path=db_path)
+        except Exception:
+            cached = None
+        if cached is not None:
+            return {'success': cached['url'] is not None, 'url': cached['url'], 'type': cached['type'], 'cached': True}
+
+    if _EXTERNAL_EXTRACTOR:
+        result = await download_pinterest_media(pin_url, return_url=True)
+    else:
+        result = await download_pinterest_media(pin_url, return_url=True, session=session)
+
+    if use_cache and (result.get('success') or not result.get('error')):
+        try:
+            url = result.get('url') if result.get('success') else None
+            await asyncio.to_thread(cache_media, key, url, result.get('type'), db_path=db_path)
+        except Exception:
+            pass
+    return dict(result, cached=False)
+
+
+async def download_pinterest(
+    pin_id,
+    save_location,
+    filename=None,
+    session: Optional[aiohttp.ClientSession] = None,
+    skip_existing: bool = True,
+    use_cache: bool = True,
+    db_path: Optional[str] = None,
+    dedup: bool = True,
+    on_stage: Optional[Callable[[str], None]] = None,
+):
     """
     Download a Pinterest pin by ID
     
@@ -82,12 +318,30 @@ async def download_pinterest(pin_id, save_location, filename=None):
         pin_id: Pinterest pin ID or full URL
         save_location: Directory path where file will be saved
         filename: Optional custom filename (without extension)
+        session: Optional aiohttp session; defaults to the shared pooled session
+        skip_existing: Skip the network entirely if the pins table already records
+            a complete file for this pin in save_location
+        use_cache: Use the media_cache table instead of re-fetching the pin page
+        db_path: Optional database path used for the skip check and media cache
+        dedup: Keep the file once in save_location's content-addressed store and link
+            it to the pin's filename; media already stored under another pin is linked
+            instead of downloaded again
+        on_stage: Called with 'downloading' once the media URL is resolved and the
+            transfer starts (used by the job queue to track progress)
     
     Returns:
-        dict: {'success': bool, 'filepath': str, 'type': str}
+        dict: {'success': bool, 'filepath': str, 'type': str, 'media_url': str, 'skipped': bool,
+               'file_hash': str, 'file_size': int, 'deduped': bool}
     """
     # Create directory if it doesn't exist
     os.makedirs(save_location, exist_ok=True)
+
+    if skip_existing and filename is None:
+        existing = await asyncio.to_thread(find_existing_downloads, [pin_id], save_location, db_path=db_path)
+        if existing:
+            hit = next(iter(existing.values()))
+            print(f"↷ Already downloaded: {hit['filepath']}")
+            return hit
     
     # Handle both URLs and IDs
     if not pin_id.startswith('http'):
@@ -98,11 +352,12 @@ async def download_pinterest(pin_id, save_location, filename=None):
     print(f"Fetching: {pin_url}")
     
     # Get media URL
-    result = await download_pinterest_media(pin_url, return_url=True)
+    session = session or await get_session()
+    result = await resolve_media(pin_url, session=session, use_cache=use_cache, db_path=db_path)
     
     if not result['success']:
         print("✗ Failed to get media URL")
-        return {'success': False, 'filepath': None, 'type': None}
+        return {'success': False, 'filepath': None, 'type': None, 'media_url': None, 'skipped': False}
     
     # Determine file extension
     media_type = result['type']
@@ -113,40 +368,167 @@ async def download_pinterest(pin_id, save_location, filename=None):
         filename = f"pin_{pin_id.split('/')[-2] if '/' in pin_id else pin_id}"
     
     filepath = os.path.join(save_location, f"{filename}{ext}")
+
+    store = MediaStore(save_location) if dedup else None
+    if store is not None:
+        known = await asyncio.to_thread(_link_known_media, store, result['url'], ext, filepath, db_path)
+        if known is not None:
+            print(f"≡ Linked already stored media: {filepath}")
+            return {
+                'success': True,
+                'filepath': filepath,
+                'type': media_type,
+                'media_url': result['url'],
+                'skipped': False,
+                'file_hash': known[0],
+                'file_size': known[1],
+                'deduped': True,
+            }
+    hasher = StreamHash() if store is not None else None
+    if on_stage is not None:
+        on_stage('downloading')
     
     # Download the file
-    success = await download_file(result['url'], filepath)
+    success = await download_file(result['url'], filepath, session=session, hasher=hasher)
+    if not success and result.get('cached'):
+        # The cached media URL may have expired; resolve the pin page again once
+        await asyncio.to_thread(invalidate_media, extract_pin_id(pin_url), db_path=db_path)
+        result = await resolve_media(pin_url, session=session, use_cache=use_cache, db_path=db_path)
+        success = result['success'] and result['type'] == media_type
+        if success:
+            success = await download_file(result['url'], filepath, session=session, hasher=hasher)
+
+    file_hash = file_size = None
+    if success:
+        file_size = os.path.getsize(filepath)
+        if hasher is not None:
+            file_hash = hasher.hexdigest()
+            await asyncio.to_thread(store.adopt, filepath, file_hash, ext)
     
     return {
         'success': success,
         'filepath': filepath if success else None,
-        'type': media_type
+        'type': media_type,
+        'media_url': result['url'],
+        'skipped': False,
+        'file_hash': file_hash,
+        'file_size': file_size,
+        'deduped': False,
     }
 
-async def main():
-    # Example 1: Download with pin ID
-    result = await download_pinterest(
-        pin_id="980166306379767499",
-        save_location="downloads"
-    )
-    print(f"Result: {result}\n")
-    
-    # Example 2: Download with full URL and custom filename
-    result = await download_pinterest(
-        pin_id="https://www.pinterest.com/pin/980166306379767499/",
-        save_location="downloads",
-        filename="my_cat_pic"
-    )
-    print(f"Result: {result}\n")
-    
-    # Example 3: Download multiple pins
-    pin_ids = ["980166306379767499", "123456789012345678"]
+
+def _link_known_media(store: MediaStore, media_url: str, ext: str, filepath: str, db_path: Optional[str]) -> Optional[tuple]:
+    """
+    If the pins table already has a digest for `media_url` and its bytes are on disk,
+    link `filepath` to them and return (file_hash, file_size); otherwise None.
+    """
+    try:
+        known = find_media_blob(media_url, db_path=db_path)
+    except Exception:
+        return None
+    if known is None:
+        return None
+    file_hash, file_size, file_path = known
+    blob = store.find(file_hash, ext, file_size)
+    if blob is None:
+        # Stored under another download folder: bring it into this store first
+        try:
+            if not file_path or os.path.getsize(file_path) != file_size:
+                return None
+            blob = store.blob_path(file_hash, ext)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            store.link(file_path, blob)
+        except OSError:
+            return None
+    store.link(blob, filepath)
+    return file_hash, file_size
+
+DEFAULT_CONCURRENCY = 6
+
+
+async def _download_one(pin_id: str, save_location: str, **kwargs) -> Dict[str, Any]:
+    try:
+        res = await download_pinterest(pin_id, save_location, **kwargs)
+    except Exception as e:
+        res = {'success': False, 'filepath': None, 'type': None, 'media_url': None, 'skipped': False, 'error': str(e)}
+    res['pin_id'] = pin_id
+    return res
+
+
+async def download_many(
+    pin_ids: Iterable[str],
+    save_location: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    session: Optional[aiohttp.ClientSession] = None,
+    skip_existing: bool = True,
+    db_path: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Download many pins on the current event loop with at most `concurrency` in flight.
+
+    Yields each download_pinterest() result (plus 'pin_id') as soon as that pin finishes,
+    so results arrive in completion order, not input order. With `skip_existing`, pins
+    already recorded on disk are found in one bulk query and yielded first as skipped.
+    """
+    pin_ids = list(pin_ids)
+    existing: Dict[str, Dict[str, Any]] = {}
+    if skip_existing:
+        existing = await asyncio.to_thread(find_existing_downloads, pin_ids, save_location, db_path)
+
+    pending = []
     for pin_id in pin_ids:
-        result = await download_pinterest(
-            pin_id=pin_id,
-            save_location="downloads/batch"
-        )
-        print(f"Downloaded: {result['filepath']}\n")
+        hit = existing.get(extract_pin_id(pin_id))
+        if hit is not None:
+            yield dict(hit, pin_id=pin_id)
+        else:
+            pending.append(pin_id)
+    if not pending:
+        return
+
+    session = session or await get_session()
+
+    async def _one(pin_id: str) -> Dict[str, Any]:
+        return await _download_one(pin_id, save_location, session=session, skip_existing=False, db_path=db_path)
+
+    async for res in map_unordered(pending, _one, concurrency):
+        yield res
+
+
+async def download_stream(
+    pin_ids: AsyncIterable[str],
+    save_location: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    session: Optional[aiohttp.ClientSession] = None,
+    skip_existing: bool = True,
+    db_path: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Like download_many, but consumes pin IDs while they are still being produced (e.g. by
+    a scroll loop), so downloading overlaps with discovery. `concurrency` workers drain a
+    small bounded queue; results are yielded in completion order.
+    """
+    session = session or await get_session()
+
+    async def _one(pin_id: str) -> Dict[str, Any]:
+        return await _download_one(pin_id, save_location, session=session, skip_existing=skip_existing, db_path=db_path)
+
+    async for res in map_unordered(pin_ids, _one, concurrency):
+        yield res
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download Pinterest pins by ID or URL")
+    parser.add_argument("pins", nargs="+", help="Pin IDs or pin URLs")
+    parser.add_argument("-o", "--output", default="downloads", help="Directory to save files in")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of simultaneous downloads")
+    args = parser.parse_args(argv)
+
+    ok = 0
+    async for result in download_many(args.pins, args.output, concurrency=args.concurrency):
+        ok += bool(result['success'])
+        print(f"Result: {result}")
+    print(f"Done: {ok}/{len(args.pins)} downloaded")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run(main())
@@ -0,0 +1,217 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from pinterest_http import USER_AGENT
+
+# Selenium is only imported when a browser is actually launched, so importing this
+# module (and the scraper built on it) stays cheap.
+
+
+def selenium_available() -> bool:
+    try:
+        import selenium  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def is_webdriver_error(exc: BaseException) -> bool:
+    try:
+        from selenium.common.exceptions import WebDriverException
+    except Exception:
+        return False
+    return isinstance(exc, WebDriverException)
+
+
+def create_driver(headless: bool = True):
+    """Launch a Chrome WebDriver configured for scraping Pinterest search pages."""
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager  # type: ignore
+    except Exception:
+        ChromeDriverManager = None  # type: ignore
+
+    options = ChromeOptions()
+    options.add_argument(f"user-agent={USER_AGENT}")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--log-level=3")
+
+    try:
+        # Prefer Selenium Manager (Selenium 4.6+). It auto-matches Chrome/driver.
+        return webdriver.Chrome(options=options)
+    except SessionNotCreatedException as e:
+        # If a pinned/cached ChromeDriver exists on PATH, Selenium Manager may still fail.
+        # Fall back to webdriver_manager only if available.
+        if ChromeDriverManager:
+            try:
+                service = ChromeService(ChromeDriverManager().install())
+                return webdriver.Chrome(service=service, options=options)
+            except Exception:
+                raise e
+        raise
+    except WebDriverException:
+        # Generic driver startup errors: try webdriver_manager as fallback.
+        if ChromeDriverManager:
+            service = ChromeService(ChromeDriverManager().install())
+            return webdriver.Chrome(service=service, options=options)
+        raise
+
+
+def _quit(driver) -> None:
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.last_used = time.monotonic()
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` warm WebDrivers so back-to-back scrapes skip Chrome's cold start.
+
+    Idle drivers are quit after `idle_ttl` seconds, and each driver is recycled after
+    `max_pages` leases to cap memory growth. A driver that fails its health check on
+    checkout, or raises a WebDriverException while leased, is quit and replaced.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        idle_ttl: float = 300.0,
+        max_pages: int = 50,
+        launcher: Callable[[], object] = create_driver,
+    ):
+        self.size = max(1, size)
+        self.idle_ttl = idle_ttl
+        self.max_pages = max_pages
+        self.launcher = launcher
+        self._idle: List[_PooledDriver] = []
+        self._entries: Dict[int, _PooledDriver] = {}
+        self._leased = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reaper: Optional[threading.Thread] = None
+        # The reaper sleeps on its own event so a release() notify always reaches an acquirer
+        self._reaper_wake = threading.Event()
+
+    @staticmethod
+    def healthy(driver) -> bool:
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a healthy driver, launching one if the pool has room; blocks while all are leased."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("BrowserPool is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    self._leased += 1
+                    break
+                if self._leased < self.size:
+                    entry = None
+                    self._leased += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No browser available")
+                self._cond.wait(remaining)
+
+        try:
+            if entry is not None and not self.healthy(entry.driver):
+                _quit(entry.driver)
+                entry = None
+            if entry is None:
+                entry = _PooledDriver(self.launcher())
+        except BaseException:
+            with self._cond:
+                self._leased -= 1
+                self._cond.notify()
+            raise
+        self._entries[id(entry.driver)] = entry
+        return entry.driver
+
+    def release(self, driver, broken: bool = False) -> None:
+        entry = self._entries.pop(id(driver), None) or _PooledDriver(driver)
+        entry.pages += 1
+        entry.last_used = time.monotonic()
+        recycle = broken or self._closed or entry.pages >= self.max_pages
+        if not recycle:
+            try:
+                # Drop the previous page so an idle browser holds as little memory as possible
+                driver.get("about:blank")
+            except Exception:
+                recycle = True
+        if recycle:
+            _quit(driver)
+        with self._cond:
+            self._leased -= 1
+            if not recycle:
+                self._idle.append(entry)
+                self._start_reaper()
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[object]:
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except BaseException as e:
+            broken = is_webdriver_error(e)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def reap(self) -> None:
+        """Quit drivers idle for longer than idle_ttl."""
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._cond:
+            stale = [e for e in self._idle if e.last_used < cutoff]
+            self._idle = [e for e in self._idle if e.last_used >= cutoff]
+        for entry in stale:
+            _quit(entry.driver)
+
+    def _start_reaper(self) -> None:
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+
+        def loop() -> None:
+            while True:
+                with self._cond:
+                    if self._closed or not self._idle:
+                        self._reaper = None
+                        return
+                self._reaper_wake.wait(min(self.idle_ttl, 30.0))
+                self.reap()
+
+        self._reaper = threading.Thread(target=loop, name="BrowserPoolReaper", daemon=True)
+        self._reaper.start()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        self._reaper_wake.set()
+        for entry in idle:
+            _quit(entry.driver)
@@ -0,0 +1,169 @@
+"""
+Headless batch entry point:
+
+    python -m pinterest_cli 980166306379767499 https://www.pinterest.com/pin/123/ -o downloads
+    python -m pinterest_cli -f pins.txt -q "cats:50" -q "dogs" -c 8 --db jobs.db
+    cat pins.txt | python -m pinterest_cli -
+    python -m pinterest_cli -f pins.txt --postprocess 4
+
+Writes one JSON object per finished pin to stdout; progress messages go to stderr.
+Importing this module does not load tkinter or selenium.
+
+With --postprocess, finished files also go through the CPU stage in pinterest_postprocess
+(dimensions, duration, thumbnail) in a process pool, adding those fields to each line.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from code_download import DEFAULT_CONCURRENCY, download_many, extract_pin_id
+from pinterest_db import PinStore
+from pinterest_http import run
+from pinterest_postprocess import PostProcessor, postprocess_stream
+from pinterest_scheduler import DEFAULT_BROWSERS, parse_job, run_jobs
+from pinterest_scraper import SEARCH_BACKENDS
+
+
+async def run_batch(
+    pins: Iterable[str],
+    queries: Iterable[Tuple[str, int]],
+    out_dir: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    browsers: int = DEFAULT_BROWSERS,
+    backend: str = "auto",
+    db_path: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Download explicit pins, then scrape and download the (query, n) searches.
+    Yields every download result with its 'query' (None for explicit pins).
+    """
+    pins = list(pins)
+    if pins:
+        store = await asyncio.to_thread(PinStore, db_path)
+        try:
+            async for res in download_many(pins, out_dir, concurrency=concurrency, db_path=db_path):
+                if res.get("success") and not res.get("skipped"):
+                    store.enqueue_upsert(download_record(res))
+                yield dict(res, query=None)
+        finally:
+            await asyncio.to_thread(store.close)
+
+    queries = list(queries)
+    if not queries:
+        return
+    results: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+    async def scrape() -> None:
+        try:
+            await run_jobs(
+                queries, out_dir, browsers=browsers, concurrency=concurrency, backend=backend,
+                db_path=db_path, on_result=lambda q, res: results.put_nowait(dict(res, query=q)),
+            )
+        finally:
+            results.put_nowait(None)
+
+    task = asyncio.ensure_future(scrape())
+    try:
+        while True:
+            res = await results.get()
+            if res is None:
+                break
+            yield res
+        await task
+    finally:
+        task.cancel()
+
+
+def download_record(res: Dict[str, Any], query: Optional[str] = None) -> Dict[str, Any]:
+    """pins-table record for a finished download result (scraped metadata is kept by the upsert)."""
+    pin_id = extract_pin_id(res["pin_id"])
+    return {
+        "pin_id": pin_id,
+        "href": f"https://www.pinterest.com/pin/{pin_id}/",
+        "media_type": res.get("type"),
+        "media_url": res.get("media_url"),
+        "file_path": res.get("filepath"),
+        "file_size": res.get("file_size"),
+        "file_hash": res.get("file_hash"),
+        "query": query,
+    }
+
+
+def read_lines(stream) -> List[str]:
+    """Non-empty, non-comment lines of a pin list."""
+    return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith("#")]
+
+
+def print_json_lines(
+    results: Callable[[], AsyncIterator[Dict[str, Any]]],
+    ok: Callable[[Dict[str, Any]], bool] = lambda res: bool(res.get("success")),
+) -> int:
+    """
+    Run the result stream on the shared loop and print each result as one JSON line.
+    Returns the exit status: 0 if `ok` held for every result, else 1.
+    """
+    out = sys.stdout
+
+    async def _run() -> bool:
+        all_ok = True
+        async for res in results():
+            all_ok = all_ok and ok(res)
+            out.write(json.dumps(res, ensure_ascii=False) + "\n")
+            out.flush()
+        return all_ok
+
+    # Keep stdout for JSON lines only; the download helpers' progress prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        return 0 if run(_run()) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pinterest_cli",
+        description="Download Pinterest pins and searches without the GUI; prints JSON lines",
+    )
+    parser.add_argument("pins", nargs="*", help="Pin IDs or pin URLs ('-' reads them from stdin)")
+    parser.add_argument("-f", "--file", help="File with one pin ID or URL per line")
+    parser.add_argument("-q", "--query", action="append", default=[],
+                        help="Search query to scrape, optionally as 'query:count' (repeatable)")
+    parser.add_argument("-n", "--count", type=int, default=20, help="Pins per query when no count is given")
+    parser.add_argument("-o", "--output", default="downloads", help="Directory to save files in")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of simultaneous downloads")
+    parser.add_argument("-k", "--browsers", type=int, default=DEFAULT_BROWSERS,
+                        help="Parallel browser sessions for the Selenium search fallback")
+    parser.add_argument("--backend", choices=SEARCH_BACKENDS, default="auto", help="Search backend for queries")
+    parser.add_argument("--db", help="SQLite database path")
+    parser.add_argument("--postprocess", nargs="?", type=int, const=0, default=None, metavar="WORKERS",
+                        help="Probe and thumbnail finished files in WORKERS processes (default: CPUs - 1)")
+    args = parser.parse_args(argv)
+
+    pins = [p for p in args.pins if p != "-"]
+    if "-" in args.pins or (not args.pins and not args.file and not args.query and not sys.stdin.isatty()):
+        pins.extend(read_lines(sys.stdin))
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            pins.extend(read_lines(f))
+    queries = [parse_job(q, args.count) for q in args.query]
+    if not pins and not queries:
+        parser.error("no pins or queries given")
+
+    async def results() -> AsyncIterator[Dict[str, Any]]:
+        stream = run_batch(pins, queries, args.output, concurrency=args.concurrency,
+                           browsers=args.browsers, backend=args.backend, db_path=args.db)
+        if args.postprocess is None:
+            async for res in stream:
+                yield res
+            return
+        with PostProcessor(workers=args.postprocess or None) as processor:
+            async for res in postprocess_stream(stream, processor):
+                yield res
+
+    return print_json_lines(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,11 @@
 import os
+import queue
+import socket
 import sqlite3
-from typing import List, Optional, Dict, Any, Tuple
+import threading
+import time
+import uuid
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 
 DB_NAME = "pinterest_scraper.db"
 DB_PATH = os.path.join(os.path.dirname(__file__), DB_NAME)
@@ -15,70 +20,719 @@ CREATE TABLE IF NOT EXISTS pins (
     media_type TEXT,
     media_url TEXT,
     file_path TEXT,
+    file_size INTEGER,
+    file_hash TEXT,
     query TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 """
 
+# Resolved pin page -> media URL. media_url NULL is a negative entry (pin has no media).
+MEDIA_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS media_cache (
+    pin_id TEXT PRIMARY KEY,
+    media_url TEXT,
+    media_type TEXT,
+    resolved_at REAL NOT NULL
+);
+"""
+
+# Durable download jobs: queued -> resolving -> downloading -> done | failed.
+# A claimed job holds a lease; jobs whose lease expired (or whose owner died) are
+# claimed again, so work survives a crash of the process running it.
+JOBS_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pin_id TEXT NOT NULL,
+    save_location TEXT NOT NULL,
+    query TEXT,
+    batch TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    file_path TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE(pin_id, save_location)
+);
+"""
+
+JOB_STATES = ("queued", "resolving", "downloading", "done", "failed")
+JOB_ACTIVE_STATES = ("resolving", "downloading")
+JOB_LEASE = 120.0
+JOB_MAX_ATTEMPTS = 3
+
+MEDIA_CACHE_TTL = 7 * 24 * 3600
+MEDIA_CACHE_NEGATIVE_TTL = 6 * 3600
+
+# Full-text index over pins, kept in sync by triggers (external-content FTS5 table).
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS pins_fts USING fts5(
+        pin_id, title, description, query,
+        content='pins', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pins_fts_ai AFTER INSERT ON pins BEGIN
+        INSERT INTO pins_fts(rowid, pin_id, title, description, query)
+        VALUES (new.id, new.pin_id, new.title, new.description, new.query);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pins_fts_ad AFTER DELETE ON pins BEGIN
+        INSERT INTO pins_fts(pins_fts, rowid, pin_id, title, description, query)
+        VALUES ('delete', old.id, old.pin_id, old.title, old.description, old.query);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pins_fts_au AFTER UPDATE OF pin_id, title, description, query ON pins BEGIN
+        INSERT INTO pins_fts(pins_fts, rowid, pin_id, title, description, query)
+        VALUES ('delete', old.id, old.pin_id, old.title, old.description, old.query);
+        INSERT INTO pins_fts(rowid, pin_id, title, description, query)
+        VALUES (new.id, new.pin_id, new.title, new.description, new.query);
+    END
+    """,
+]
+
+# Columns added after the first release; init_db() adds them to older databases.
+MIGRATION_COLUMNS = [
+    ("file_size", "INTEGER"),
+    ("file_hash", "TEXT"),
+]
+
+# SQLite's default host-parameter limit is 999; stay well below it for IN (...) lookups.
+LOOKUP_BATCH = 500
+
 INDEXES_SQL = [
     "CREATE INDEX IF NOT EXISTS idx_pins_pin_id ON pins(pin_id)",
     "CREATE INDEX IF NOT EXISTS idx_pins_query ON pins(query)",
+    "CREATE INDEX IF NOT EXISTS idx_pins_media_url ON pins(media_url)",
+    "CREATE INDEX IF NOT EXISTS idx_pins_file_hash ON pins(file_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, available_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch, state)",
 ]
 
+def _ensure_parent(path: str) -> None:
+    # A bare file name like "jobs.db" has no directory to create
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+
 def get_conn(db_path: Optional[str] = None) -> sqlite3.Connection:
     path = db_path or DB_PATH
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _ensure_parent(path)
     conn = sqlite3.connect(path)
     conn.execute("PRAGMA journal_mode=WAL;")
     return conn
 
 
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(SCHEMA_SQL)
+    conn.execute(MEDIA_CACHE_SQL)
+    conn.execute(JOBS_SQL)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(pins)")}
+    for name, decl in MIGRATION_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE pins ADD COLUMN {name} {decl}")
+    for sql in INDEXES_SQL:
+        conn.execute(sql)
+    _create_fts(conn)
+    conn.commit()
+
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    """Create the FTS index and backfill it from existing rows; a no-op without FTS5."""
+    had_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='pins_fts'"
+    ).fetchone() is not None
+    try:
+        for sql in FTS_SQL:
+            conn.execute(sql)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: fetch_pins falls back to LIKE
+        return
+    if not had_fts:
+        conn.execute("INSERT INTO pins_fts(pins_fts) VALUES ('rebuild')")
+
+
+def _fts_query(search: str) -> str:
+    # Every word must match, each as a prefix: 'cat vid' -> "cat"* "vid"*
+    words = search.split()
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+
 def init_db(db_path: Optional[str] = None) -> str:
     path = db_path or DB_PATH
     with get_conn(path) as conn:
-        conn.execute(SCHEMA_SQL)
-        for sql in INDEXES_SQL:
-            conn.execute(sql)
-        conn.commit()
+        _create_schema(conn)
     return path
 
 
+def _file_size(file_path: Optional[str]) -> Optional[int]:
+    if not file_path:
+        return None
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
+
+
+UPSERT_SQL = """
+INSERT INTO pins (pin_id, href, title, description, media_type, media_url, file_path, file_size, file_hash, query)
+VALUES (:pin_id, :href, :title, :description, :media_type, :media_url, :file_path, :file_size, :file_hash, :query)
+ON CONFLICT(pin_id) DO UPDATE SET
+    href=COALESCE(excluded.href, href),
+    title=COALESCE(excluded.title, title),
+    description=COALESCE(excluded.description, description),
+    media_type=COALESCE(excluded.media_type, media_type),
+    media_url=COALESCE(excluded.media_url, media_url),
+    file_size=CASE WHEN excluded.file_path IS NOT NULL THEN excluded.file_size ELSE file_size END,
+    file_hash=CASE WHEN excluded.file_path IS NOT NULL THEN excluded.file_hash ELSE file_hash END,
+    file_path=COALESCE(excluded.file_path, file_path),
+    query=COALESCE(excluded.query, query)
+;
+"""
+
+UPDATE_FILE_PATH_SQL = (
+    "UPDATE pins SET file_path=?, file_size=?, file_hash=?, media_url=COALESCE(?, media_url) WHERE pin_id=?"
+)
+
+RECORD_FIELDS = (
+    "pin_id", "href", "title", "description", "media_type", "media_url", "file_path", "file_size", "file_hash", "query",
+)
+
+
+def _prepare_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    prepared = {k: record.get(k) for k in RECORD_FIELDS}
+    if prepared["file_size"] is None:
+        prepared["file_size"] = _file_size(prepared["file_path"])
+    return prepared
+
+
+def _prepare_file_path(item: Tuple) -> Tuple[str, Optional[int], Optional[str], Optional[str], str]:
+    # (pin_id, file_path[, file_size[, file_hash[, media_url]]]) -> UPDATE_FILE_PATH_SQL params
+    pin_id, file_path = item[0], item[1]
+    file_size = item[2] if len(item) > 2 and item[2] is not None else _file_size(file_path)
+    file_hash = item[3] if len(item) > 3 else None
+    media_url = item[4] if len(item) > 4 else None
+    return (file_path, file_size, file_hash, media_url, pin_id)
+
+
 def upsert_pin(record: Dict[str, Any], db_path: Optional[str] = None) -> None:
     with get_conn(db_path) as conn:
-        conn.execute(
-            """
-            INSERT INTO pins (pin_id, href, title, description, media_type, media_url, file_path, query)
-            VALUES (:pin_id, :href, :title, :description, :media_type, :media_url, :file_path, :query)
-            ON CONFLICT(pin_id) DO UPDATE SET
-                href=excluded.href,
-                title=excluded.title,
-                description=excluded.description,
-                media_type=excluded.media_type,
-                media_url=excluded.media_url,
-                file_path=COALESCE(excluded.file_path, file_path),
-                query=excluded.query
-            ;
-            """,
-            record,
-        )
+        conn.execute(UPSERT_SQL, _prepare_record(record))
         conn.commit()
 
 
-def fetch_pins(limit: int = 100, search: Optional[str] = None, db_path: Optional[str] = None) -> List[Tuple]:
-    sql = "SELECT id, pin_id, href, title, description, media_type, media_url, file_path, query, created_at FROM pins"
-    params: Tuple[Any, ...] = tuple()
-    if search:
-        sql += " WHERE pin_id LIKE ? OR title LIKE ? OR description LIKE ? OR query LIKE ?"
-        like = f"%{search}%"
-        params = (like, like, like, like)
-    sql += " ORDER BY id DESC LIMIT ?"
-    params = params + (limit,)
+PIN_COLUMNS = "id, pin_id, href, title, description, media_type, media_url, file_path, query, created_at"
+
+
+def fetch_pins(limit: int = 100, search: Optional[str] = None, db_path: Optional[str] = None, offset: int = 0) -> List[Tuple]:
+    """
+    Newest pins first, or with `search` the best matches first.
+
+    Search goes through the pins_fts index (every word matched as a prefix, ranked by
+    bm25), so pin_id prefixes work too; databases without FTS5 fall back to LIKE.
+    `offset` pages through search results; use fetch_pins_after to page the full table.
+    """
     with get_conn(db_path) as conn:
-        cur = conn.execute(sql, params)
+        if search and search.split():
+            try:
+                cur = conn.execute(
+                    f"SELECT {', '.join('p.' + c.strip() for c in PIN_COLUMNS.split(','))} "
+                    "FROM pins_fts JOIN pins p ON p.id = pins_fts.rowid "
+                    "WHERE pins_fts MATCH ? ORDER BY pins_fts.rank LIMIT ? OFFSET ?",
+                    (_fts_query(search), limit, offset),
+                )
+                return cur.fetchall()
+            except sqlite3.OperationalError:
+                like = f"%{search}%"
+                cur = conn.execute(
+                    f"SELECT {PIN_COLUMNS} FROM pins "
+                    "WHERE pin_id LIKE ? OR title LIKE ? OR description LIKE ? OR query LIKE ? "
+                    "ORDER BY id DESC LIMIT ? OFFSET ?",
+                    (like, like, like, like, limit, offset),
+                )
+                return cur.fetchall()
+        cur = conn.execute(f"SELECT {PIN_COLUMNS} FROM pins ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset))
         return cur.fetchall()
 
 
-def update_file_path(pin_id: str, file_path: str, db_path: Optional[str] = None) -> None:
+def fetch_pins_after(after_id: Optional[int], limit: int = 100, db_path: Optional[str] = None) -> List[Tuple]:
+    """Keyset page, newest first: the next `limit` pins with id below `after_id` (None = from the top)."""
     with get_conn(db_path) as conn:
-        conn.execute("UPDATE pins SET file_path=? WHERE pin_id=?", (file_path, pin_id))
+        if after_id is None:
+            cur = conn.execute(f"SELECT {PIN_COLUMNS} FROM pins ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            cur = conn.execute(
+                f"SELECT {PIN_COLUMNS} FROM pins WHERE id < ? ORDER BY id DESC LIMIT ?", (after_id, limit)
+            )
+        return cur.fetchall()
+
+
+def fetch_pins_newer(newer_than_id: int, limit: int = 1000, db_path: Optional[str] = None) -> List[Tuple]:
+    """Pins added since `newer_than_id` (the current top row), newest first."""
+    with get_conn(db_path) as conn:
+        cur = conn.execute(
+            f"SELECT {PIN_COLUMNS} FROM pins WHERE id > ? ORDER BY id DESC LIMIT ?", (newer_than_id, limit)
+        )
+        return cur.fetchall()
+
+
+def fetch_pins_by_pin_id(pin_ids: Iterable[str], db_path: Optional[str] = None) -> List[Tuple]:
+    """Current rows for the given pin IDs, e.g. to refresh rows whose file_path changed."""
+    ids = list(dict.fromkeys(pin_ids))
+    rows: List[Tuple] = []
+    with get_conn(db_path) as conn:
+        for i in range(0, len(ids), LOOKUP_BATCH):
+            batch = ids[i:i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            rows.extend(conn.execute(f"SELECT {PIN_COLUMNS} FROM pins WHERE pin_id IN ({marks})", batch))
+    return rows
+
+
+def update_file_path(
+    pin_id: str,
+    file_path: str,
+    db_path: Optional[str] = None,
+    file_size: Optional[int] = None,
+    file_hash: Optional[str] = None,
+    media_url: Optional[str] = None,
+) -> None:
+    with get_conn(db_path) as conn:
+        conn.execute(UPDATE_FILE_PATH_SQL, _prepare_file_path((pin_id, file_path, file_size, file_hash, media_url)))
         conn.commit()
+
+
+def fetch_downloaded(pin_ids: Iterable[str], db_path: Optional[str] = None) -> Dict[str, Tuple[str, Optional[int], Optional[str]]]:
+    """Bulk lookup of pins that have a recorded file: {pin_id: (file_path, file_size, media_type)}."""
+    ids = list(dict.fromkeys(pin_ids))
+    found: Dict[str, Tuple[str, Optional[int], Optional[str]]] = {}
+    with get_conn(db_path) as conn:
+        for i in range(0, len(ids), LOOKUP_BATCH):
+            batch = ids[i:i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            cur = conn.execute(
+                f"SELECT pin_id, file_path, file_size, media_type FROM pins WHERE file_path IS NOT NULL AND pin_id IN ({marks})",
+                batch,
+            )
+            for pin_id, file_path, file_size, media_type in cur:
+                found[pin_id] = (file_path, file_size, media_type)
+    return found
+
+
+def find_media_blob(media_url: str, db_path: Optional[str] = None) -> Optional[Tuple[str, int, str]]:
+    """(file_hash, file_size, file_path) of the latest download of `media_url` that has a digest."""
+    with get_conn(db_path) as conn:
+        return conn.execute(
+            "SELECT file_hash, file_size, file_path FROM pins "
+            "WHERE media_url=? AND file_hash IS NOT NULL AND file_size IS NOT NULL ORDER BY id DESC LIMIT 1",
+            (media_url,),
+        ).fetchone()
+
+
+
+def get_cached_media(
+    pin_id: str,
+    ttl: float = MEDIA_CACHE_TTL,
+    negative_ttl: float = MEDIA_CACHE_NEGATIVE_TTL,
+    db_path: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Return {'url', 'type', 'resolved_at'} for a fresh cache entry, or None on a miss.
+    A fresh negative entry is returned with url=None.
+    """
+    with get_conn(db_path) as conn:
+        row = conn.execute(
+            "SELECT media_url, media_type, resolved_at FROM media_cache WHERE pin_id=?", (pin_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    media_url, media_type, resolved_at = row
+    age = time.time() - resolved_at
+    if age > (ttl if media_url else negative_ttl):
+        return None
+    return {"url": media_url, "type": media_type, "resolved_at": resolved_at}
+
+
+def cache_media(pin_id: str, media_url: Optional[str], media_type: Optional[str], db_path: Optional[str] = None) -> None:
+    """Store a resolved media URL (or a negative entry when media_url is None) and mirror it onto pins."""
+    with get_conn(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO media_cache (pin_id, media_url, media_type, resolved_at) VALUES (?, ?, ?, ?)",
+            (pin_id, media_url, media_type, time.time()),
+        )
+        if media_url:
+            conn.execute(
+                "UPDATE pins SET media_url=?, media_type=? WHERE pin_id=?", (media_url, media_type, pin_id)
+            )
+        conn.commit()
+
+
+def invalidate_media(pin_id: str, db_path: Optional[str] = None) -> None:
+    with get_conn(db_path) as conn:
+        conn.execute("DELETE FROM media_cache WHERE pin_id=?", (pin_id,))
+        conn.commit()
+
+
+class PinStore:
+    """
+    Long-lived, single-connection writer for the pins table.
+
+    Batch writes go through upsert_many/update_file_paths_many (one transaction each).
+    Download workers can instead enqueue_upsert/enqueue_file_path, which only put the
+    write on a queue; a background thread commits queued writes in batches so callers
+    never wait on SQLite or fsync. Call flush() to wait for queued writes, close() when done;
+    both raise the last error if a queued batch could not be written.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA temp_store=MEMORY",
+    )
+    WRITER_BATCH = 500
+    WRITER_INTERVAL = 0.25
+    # Other writers (e.g. JobQueue.claim's BEGIN IMMEDIATE) can hold the lock for a while
+    BUSY_TIMEOUT = 30
+    WRITER_RETRIES = 3
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.path = db_path or DB_PATH
+        _ensure_parent(self.path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.BUSY_TIMEOUT)
+        for pragma in self.PRAGMAS:
+            self.conn.execute(pragma)
+        self._lock = threading.Lock()
+        with self._lock:
+            _create_schema(self.conn)
+        self._queue: "queue.Queue[Optional[Tuple[str, Any]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.last_error: Optional[Exception] = None
+
+    def __enter__(self) -> "PinStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        self._write([("upsert", _prepare_record(r)) for r in records])
+
+    def update_file_paths_many(self, items: Iterable[Tuple]) -> None:
+        """items: (pin_id, file_path[, file_size[, file_hash[, media_url]]]) tuples."""
+        self._write([("file_path", _prepare_file_path(i)) for i in items])
+
+    def _write(self, ops: List[Tuple[str, Any]]) -> None:
+        upserts = [params for kind, params in ops if kind == "upsert"]
+        paths = [params for kind, params in ops if kind == "file_path"]
+        if not upserts and not paths:
+            return
+        with self._lock, self.conn:
+            if upserts:
+                self.conn.executemany(UPSERT_SQL, upserts)
+            if paths:
+                self.conn.executemany(UPDATE_FILE_PATH_SQL, paths)
+
+    # Async-friendly write queue
+
+    def enqueue_upsert(self, record: Dict[str, Any]) -> None:
+        self._enqueue(("upsert", record))
+
+    def enqueue_file_path(
+        self,
+        pin_id: str,
+        file_path: str,
+        file_size: Optional[int] = None,
+        file_hash: Optional[str] = None,
+        media_url: Optional[str] = None,
+    ) -> None:
+        self._enqueue(("file_path", (pin_id, file_path, file_size, file_hash, media_url)))
+
+    def _enqueue(self, op: Tuple[str, Any]) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, name="PinStoreWriter", daemon=True)
+            self._writer.start()
+        self._queue.put(op)
+
+    def _writer_loop(self) -> None:
+        while True:
+            op = self._queue.get()
+            batch = [op]
+            deadline = time.monotonic() + self.WRITER_INTERVAL
+            while op is not None and len(batch) < self.WRITER_BATCH:
+                try:
+                    op = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(op)
+            stop = batch[-1] is None
+            ops = [o for o in batch if o is not None]
+            try:
+                self._write_retrying([
+                    (kind, _prepare_record(params) if kind == "upsert" else _prepare_file_path(params))
+                    for kind, params in ops
+                ])
+            except sqlite3.Error as e:
+                # Reported by the next flush() / close()
+                self.last_error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_retrying(self, ops: List[Tuple[str, Any]]) -> None:
+        """_write(), retried with backoff while the database stays locked past BUSY_TIMEOUT."""
+        for attempt in range(self.WRITER_RETRIES):
+            try:
+                self._write(ops)
+                return
+            except sqlite3.OperationalError as e:
+                busy = "locked" in str(e) or "busy" in str(e)
+                if not busy or attempt + 1 >= self.WRITER_RETRIES:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _raise_last_error(self) -> None:
+        error, self.last_error = self.last_error, None
+        if error is not None:
+            raise error
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed; raises if any of them failed."""
+        if self._writer is not None:
+            self._queue.join()
+        self._raise_last_error()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            self.conn.close()
+        self._raise_last_error()
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process behind a lease owner id ("host:pid:token") may still be running."""
+    try:
+        host, pid, _ = (owner or "").split(":", 2)
+        pid_num = int(pid)
+    except ValueError:
+        return True
+    if host != socket.gethostname() or pid_num == os.getpid() or os.name == "nt":
+        # Other hosts (and Windows, where os.kill(pid, 0) is not a probe) wait for lease expiry
+        return True
+    try:
+        os.kill(pid_num, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Durable download queue in the jobs table, shared by any number of workers and processes.
+
+    Workers claim() jobs, which moves them to 'resolving' under a lease of `lease`
+    seconds that they keep alive with renew(). A job is finished with done() or fail();
+    fail() requeues it with a delay until it has used `max_attempts`. Jobs whose lease
+    ran out, or whose owner process is gone (see recover()), are claimed again.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, lease: float = JOB_LEASE, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = db_path or DB_PATH
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        _ensure_parent(self.path)
+        # Autocommit mode so claim() can take the write lock up front with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        with self._lock:
+            _create_schema(self.conn)
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def enqueue(self, pin_ids: Iterable[str], save_location: str, query: Optional[str] = None, batch: Optional[str] = None) -> int:
+        """
+        Add download jobs; a pin already queued, done or failed for this folder is queued
+        again under `batch`. Jobs currently leased by a worker are left alone.
+        """
+        now = time.time()
+        rows = [(pin_id, save_location, query, batch, now, now) for pin_id in dict.fromkeys(pin_ids)]
+        if not rows:
+            return 0
+        with self._lock:
+            cur = self.conn.executemany(
+                "INSERT INTO jobs (pin_id, save_location, query, batch, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(pin_id, save_location) DO UPDATE SET "
+                "state='queued', attempts=0, available_at=0, last_error=NULL, lease_owner=NULL, "
+                "query=excluded.query, batch=excluded.batch, updated_at=excluded.updated_at "
+                "WHERE jobs.state IN ('queued', 'done', 'failed')",
+                rows,
+            )
+            return cur.rowcount
+
+    def claim(self, limit: int = 1, batch: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lease up to `limit` runnable jobs (oldest first) and move them to 'resolving'."""
+        now = time.time()
+        where = "((state='queued' AND available_at<=?) OR (state IN ('resolving', 'downloading') AND lease_expires<?))"
+        params: List[Any] = [now, now]
+        if batch is not None:
+            where += " AND batch=?"
+            params.append(batch)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Abandoned jobs that already used every attempt are given up on
+                self.conn.execute(
+                    "UPDATE jobs SET state='failed', lease_owner=NULL, updated_at=?, "
+                    "last_error=COALESCE(last_error, 'lease expired') "
+                    "WHERE state IN ('resolving', 'downloading') AND lease_expires<? AND attempts>=?",
+                    (now, now, self.max_attempts),
+                )
+                rows = self.conn.execute(
+                    f"SELECT id, pin_id, save_location, query, batch, attempts FROM jobs WHERE {where} ORDER BY id LIMIT ?",
+                    params + [limit],
+                ).fetchall()
+                if rows:
+                    marks = ",".join("?" * len(rows))
+                    self.conn.execute(
+                        f"UPDATE jobs SET state='resolving', attempts=attempts+1, lease_owner=?, lease_expires=?, "
+                        f"updated_at=? WHERE id IN ({marks})",
+                        [self.owner, now + self.lease, now] + [r[0] for r in rows],
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [
+            {"id": r[0], "pin_id": r[1], "save_location": r[2], "query": r[3], "batch": r[4], "attempts": r[5] + 1}
+            for r in rows
+        ]
+
+    def _update(self, sql: str, params: Tuple) -> None:
+        with self._lock:
+            self.conn.execute(sql, params)
+
+    def mark(self, job_id: int, state: str) -> None:
+        """Advance a leased job to another in-progress state (e.g. 'downloading')."""
+        self._update(
+            "UPDATE jobs SET state=?, updated_at=? WHERE id=? AND lease_owner=?",
+            (state, time.time(), job_id, self.owner),
+        )
+
+    def renew(self, job_ids: Iterable[int]) -> None:
+        """Extend the lease on jobs this worker still holds."""
+        ids = list(job_ids)
+        if not ids:
+            return
+        marks = ",".join("?" * len(ids))
+        self._update(
+            f"UPDATE jobs SET lease_expires=? WHERE lease_owner=? AND id IN ({marks})",
+            tuple([time.time() + self.lease, self.owner] + ids),
+        )
+
+    def done(self, job_id: int, file_path: Optional[str] = None) -> bool:
+        """Finish a job this worker still holds; returns False if its lease was lost to another worker."""
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE jobs SET state='done', file_path=?, last_error=NULL, lease_owner=NULL, updated_at=? "
+                "WHERE id=? AND lease_owner=?",
+                (file_path, time.time(), job_id, self.owner),
+            )
+            return cur.rowcount > 0
+
+    def fail(self, job_id: int, error: Optional[str], retry_in: float = 0.0) -> bool:
+        """
+        Record a failed attempt; requeue after `retry_in` seconds unless attempts are used up.
+        Returns True if requeued. Jobs whose lease was lost to another worker are left alone.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE id=? AND lease_owner=?", (job_id, self.owner)
+            ).fetchone()
+            if row is None:
+                return False
+            retry = row[0] < self.max_attempts
+            self.conn.execute(
+                "UPDATE jobs SET state=?, last_error=?, lease_owner=NULL, available_at=?, updated_at=? "
+                "WHERE id=? AND lease_owner=?",
+                ("queued" if retry else "failed", error, now + retry_in, now, job_id, self.owner),
+            )
+        return retry
+
+    def release(self, job_ids: Iterable[int]) -> None:
+        """Give leased jobs back (e.g. on shutdown) without counting the attempt."""
+        ids = list(job_ids)
+        if not ids:
+            return
+        marks = ",".join("?" * len(ids))
+        self._update(
+            f"UPDATE jobs SET state='queued', attempts=MAX(attempts-1, 0), lease_owner=NULL, updated_at=? "
+            f"WHERE lease_owner=? AND state IN ('resolving', 'downloading') AND id IN ({marks})",
+            tuple([time.time(), self.owner] + ids),
+        )
+
+    def recover(self) -> int:
+        """Expire leases held by processes on this host that no longer exist; returns how many jobs were freed."""
+        with self._lock:
+            owners = [r[0] for r in self.conn.execute(
+                "SELECT DISTINCT lease_owner FROM jobs WHERE state IN ('resolving', 'downloading') AND lease_owner IS NOT NULL"
+            )]
+            dead = [o for o in owners if not _owner_alive(o)]
+            if not dead:
+                return 0
+            marks = ",".join("?" * len(dead))
+            cur = self.conn.execute(
+                f"UPDATE jobs SET lease_expires=0 WHERE state IN ('resolving', 'downloading') AND lease_owner IN ({marks})",
+                dead,
+            )
+            return cur.rowcount
+
+    def adopt(self, batch: str) -> int:
+        """Move every unfinished job that nobody holds a live lease on into `batch`; returns the count."""
+        now = time.time()
+        self.recover()
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE jobs SET batch=? WHERE state='queued' "
+                "OR (state IN ('resolving', 'downloading') AND lease_expires<?)",
+                (batch, now),
+            )
+            return cur.rowcount
+
+    def counts(self, batch: Optional[str] = None) -> Dict[str, int]:
+        """{state: number of jobs}, optionally for one batch."""
+        with self._lock:
+            if batch is None:
+                cur = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+            else:
+                cur = self.conn.execute("SELECT state, COUNT(*) FROM jobs WHERE batch=? GROUP BY state", (batch,))
+            found = dict(cur.fetchall())
+        return {state: found.get(state, 0) for state in JOB_STATES}
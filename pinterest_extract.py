@@ -0,0 +1,261 @@
+"""
+Streaming media-URL extraction from pin pages.
+
+MediaExtractor is fed the page as it downloads and reports as soon as it has a
+definite answer, so the caller can stop reading the body. Structured data (the
+__PWS_DATA__ / __PWS_INITIAL_PROPS__ state blob and JSON-LD) is parsed as JSON to pick
+the highest-resolution variant; the meta-tag / regex matches of the original extractor
+are kept as a fallback for pages without it.
+"""
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# (url, 'video' | 'image')
+Media = Tuple[str, str]
+
+OG_VIDEO_RE = re.compile(r'<meta[^>]+property="og:video"[^>]+content="([^"]+)"')
+OG_IMAGE_RE = re.compile(r'<meta[^>]+property="og:image"[^>]+content="([^"]+)"')
+CONTENT_URL_RE = re.compile(r'"contentUrl"\s*:\s*"(https?:[^"\\]+\.mp4)"')
+ORIG_IMAGE_RE = re.compile(r'"images"\s*:\s*\{[^}]*"orig"\s*:\s*\{[^}]*"url"\s*:\s*"(https?:[^"\\]+)"')
+BLOB_START_RE = re.compile(
+    r'<script\b[^>]*(?:id="__PWS_(?:DATA|INITIAL_PROPS)__"|type="application/ld\+json")[^>]*>'
+)
+BLOB_END = "</script>"
+
+# Characters rescanned from the previous chunk so a match split across two chunks is
+# still found; every pattern's match fits within this distance of its anchor
+SCAN_OVERLAP = 1024
+
+
+def _is_mp4(url: Any) -> bool:
+    return isinstance(url, str) and url.startswith("http") and url.split("?", 1)[0].endswith(".mp4")
+
+
+def _walk(obj: Any) -> Iterator[Dict[str, Any]]:
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            yield cur
+            stack.extend(cur.values())
+        elif isinstance(cur, list):
+            stack.extend(cur)
+
+
+def _find_pin(data: Any, pin_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The pin object for `pin_id` (or the first pin-like object when no ID is known)."""
+    first = None
+    for d in _walk(data):
+        if "images" not in d and "videos" not in d and "story_pin_data" not in d:
+            continue
+        if pin_id is None or str(d.get("id")) == pin_id:
+            return d
+        first = first or d
+    return first if pin_id is None else None
+
+
+def best_video(pin: Dict[str, Any]) -> Optional[str]:
+    """Largest .mp4 among the pin's video_list entries (story pins included); HLS is skipped."""
+    best, best_area = None, -1
+    for d in _walk(pin):
+        video_list = d.get("video_list")
+        if not isinstance(video_list, dict):
+            continue
+        for variant in video_list.values():
+            if isinstance(variant, dict) and _is_mp4(variant.get("url")):
+                area = (variant.get("width") or 0) * (variant.get("height") or 0)
+                if area > best_area:
+                    best, best_area = variant["url"], area
+    return best
+
+
+def best_image(pin: Dict[str, Any]) -> Optional[str]:
+    """The 'orig' image, else the widest listed size."""
+    images = pin.get("images")
+    if not isinstance(images, dict):
+        return None
+    orig = images.get("orig")
+    if isinstance(orig, dict) and orig.get("url"):
+        return orig["url"]
+    sizes = [v for v in images.values() if isinstance(v, dict) and v.get("url")]
+    if not sizes:
+        return None
+    return max(sizes, key=lambda v: v.get("width") or 0)["url"]
+
+
+def media_from_state(data: Any, pin_id: Optional[str] = None) -> Optional[Media]:
+    """Best media from a parsed __PWS_DATA__ / __PWS_INITIAL_PROPS__ blob."""
+    pin = _find_pin(data, pin_id)
+    if pin is None:
+        return None
+    video = best_video(pin)
+    if video:
+        return video, "video"
+    image = best_image(pin)
+    if image:
+        return image, "image"
+    return None
+
+
+def media_from_ld(data: Any) -> Optional[Media]:
+    """Media from a JSON-LD blob: a VideoObject's contentUrl, or an image."""
+    image = None
+    for d in _walk(data):
+        if d.get("@type") == "VideoObject" and _is_mp4(d.get("contentUrl")):
+            return d["contentUrl"], "video"
+        if image is None and isinstance(d.get("image"), str) and d["image"].startswith("http"):
+            image = d["image"]
+    return (image, "image") if image else None
+
+
+class MediaExtractor:
+    """
+    Incremental pin-page scanner: call feed() with each chunk (bytes or str) until it
+    returns True, then result(). feed() returns True as soon as the answer cannot change:
+    a video was found, or the pin's structured state was parsed. Otherwise call close()
+    at the end of the body to settle on the best image seen.
+
+    Only the last SCAN_OVERLAP characters (plus any script blob still being received)
+    are kept in memory.
+    """
+
+    def __init__(self, pin_id: Optional[str] = None, encoding: str = "utf-8"):
+        self.pin_id = pin_id
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._buf = ""
+        self._scanned = 0
+        self._blob_start: Optional[int] = None
+        self._blob_pos = 0
+        self.bytes_read = 0
+        self.done = False
+        self._in_head = True
+        self._video: Optional[str] = None
+        self._structured: Optional[Media] = None
+        self._ld_image: Optional[str] = None
+        self._orig_image: Optional[str] = None
+        self._og_image: Optional[str] = None
+
+    def feed(self, chunk) -> bool:
+        if self.done:
+            return True
+        if isinstance(chunk, bytes):
+            self.bytes_read += len(chunk)
+            chunk = self._decoder.decode(chunk)
+        else:
+            self.bytes_read += len(chunk)
+        self._buf += chunk
+        self._scan()
+        return self.done
+
+    def close(self) -> Optional[Media]:
+        if not self.done:
+            self._buf += self._decoder.decode(b"", final=True)
+            self._scan()
+            if not self.done and self._blob_start is not None:
+                # The body ended inside a blob: search what arrived of it
+                self._search_fallbacks(self._buf, self._blob_start, len(self._buf))
+            self.done = True
+        return self.result()
+
+    def result(self) -> Optional[Media]:
+        if self._video:
+            return self._video, "video"
+        if self._structured:
+            return self._structured
+        image = self._orig_image or self._ld_image or self._og_image
+        return (image, "image") if image else None
+
+    def _scan(self) -> None:
+        buf = self._buf
+        start = max(0, self._scanned - SCAN_OVERLAP)
+
+        # og: meta tags only live in <head>; stop looking for them once it has ended
+        if self._in_head:
+            m = OG_VIDEO_RE.search(buf, start)
+            if m:
+                self._video = m.group(1)
+                self.done = True
+                return
+            if self._og_image is None:
+                m = OG_IMAGE_RE.search(buf, start)
+                if m:
+                    self._og_image = m.group(1)
+            self._in_head = buf.find("</head>", start) < 0
+
+        # Script blobs are parsed whole once their closing tag has arrived. The regex
+        # fallbacks run between blobs as the page streams in, but over a blob's text only
+        # if parsing it gave no answer
+        pos = max(start, self._blob_pos)
+        while True:
+            if self._blob_start is None:
+                m = BLOB_START_RE.search(buf, pos)
+                self._search_fallbacks(buf, pos, m.start() if m else len(buf))
+                if self.done:
+                    return
+                if not m:
+                    break
+                self._blob_start = m.end()
+            end = buf.find(BLOB_END, max(self._blob_start, start))
+            if end < 0:
+                break
+            blob = buf[self._blob_start:end]
+            self._parse_blob(blob)
+            if not self.done:
+                self._search_fallbacks(blob, 0, len(blob))
+            self._blob_start = None
+            pos = self._blob_pos = end + len(BLOB_END)
+            if self.done:
+                return
+
+        self._scanned = len(buf)
+        # Trim what has been scanned, keeping the overlap and any open blob
+        cut = len(buf) - SCAN_OVERLAP
+        if self._blob_start is not None:
+            cut = min(cut, self._blob_start)
+        if cut > 0:
+            self._buf = buf[cut:]
+            self._scanned -= cut
+            self._blob_pos = max(0, self._blob_pos - cut)
+            if self._blob_start is not None:
+                self._blob_start -= cut
+
+    def _search_fallbacks(self, text: str, pos: int, endpos: int) -> None:
+        if self._video is None:
+            m = CONTENT_URL_RE.search(text, pos, endpos)
+            if m:
+                self._video = m.group(1)
+                self.done = True
+                return
+        if self._orig_image is None:
+            m = ORIG_IMAGE_RE.search(text, pos, endpos)
+            if m:
+                self._orig_image = m.group(1)
+
+    def _parse_blob(self, text: str) -> None:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        if isinstance(data, dict) and ("props" in data or "initialReduxState" in data or "resourceResponses" in data):
+            media = media_from_state(data, self.pin_id)
+            if media:
+                self._structured = media
+                self.done = True
+            return
+        media = media_from_ld(data)
+        if media is None:
+            return
+        if media[1] == "video":
+            self._video = media[0]
+            self.done = True
+        else:
+            self._ld_image = self._ld_image or media[0]
+
+
+def extract_media(html: str, pin_id: Optional[str] = None) -> Optional[Media]:
+    """One-shot helper for a page that is already in memory."""
+    ex = MediaExtractor(pin_id)
+    ex.feed(html)
+    return ex.close()
@@ -1,66 +1,230 @@
+import argparse
+import asyncio
+import logging
 import os
 import re
-import threading
-import asyncio
+import time
 import tkinter as tk
+import uuid
+from collections import OrderedDict, deque
 from tkinter import ttk, filedialog, messagebox
-from typing import List, Dict, Any
-import time
+from typing import List, Dict, Any, Callable, Optional
 
-# Selenium imports (with webdriver_manager fallback if available)
-try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
-    from selenium.webdriver.chrome.options import Options as ChromeOptions
-    from selenium.webdriver.chrome.service import Service as ChromeService
-    try:
-        from webdriver_manager.chrome import ChromeDriverManager  # type: ignore
-    except Exception:
-        ChromeDriverManager = None  # type: ignore
-except Exception:
-    webdriver = None  # type: ignore
-
-from pinterest_db import init_db, upsert_pin, fetch_pins, update_file_path
+from pinterest_db import (
+    JobQueue, PinStore, init_db, upsert_pin, fetch_pins, fetch_pins_after, fetch_pins_newer, fetch_pins_by_pin_id,
+)
 from code_download import download_pinterest
+from pinterest_http import LoopThread
+from pinterest_scraper import make_search_backend
+from pinterest_browser import BrowserPool, selenium_available
+from pinterest_jobs import process_jobs
+from pinterest_postprocess import THUMB_SIZE, PostProcessor, render_thumbnail, thumbnail_path
+
+DOWNLOAD_CONCURRENCY = 6
+DB_PAGE_SIZE = 200
+DB_LOAD_MORE_AT = 0.9
+UI_FLUSH_MS = 50
+UI_FLUSH_BUDGET = 0.008
+LOG_MAX_LINES = 2000
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+THUMB_MAX_IMAGES = 100
+THUMB_WORKERS = 2
+THUMB_PREFETCH_MS = 150
+
+class UIQueue:
+    """
+    Thread-safe queue of UI updates drained on the Tk thread by a single `after` timer.
+
+    Workers call post() from any thread. Every UI_FLUSH_MS the timer flushes the
+    registered log views, then runs queued callbacks for at most UI_FLUSH_BUDGET
+    seconds; the rest wait for the next tick.
+    """
+
+    def __init__(self, widget: tk.Misc, interval_ms: int = UI_FLUSH_MS, budget: float = UI_FLUSH_BUDGET):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.budget = budget
+        self._calls: deque = deque()
+        self._views: List["LogView"] = []
+        self._closed = False
+        self.widget.after(self.interval_ms, self._drain)
+
+    def post(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self._calls.append((fn, args, kwargs))
+
+    def add_view(self, view: "LogView") -> None:
+        self._views.append(view)
+
+    def close(self) -> None:
+        self._closed = True
+
+    def _drain(self) -> None:
+        if self._closed:
+            return
+        try:
+            for view in self._views:
+                try:
+                    view.flush()
+                except Exception:
+                    logging.getLogger("pinterest_gui").exception("Log view flush failed")
+            deadline = time.perf_counter() + self.budget
+            while self._calls and time.perf_counter() < deadline:
+                fn, args, kwargs = self._calls.popleft()
+                try:
+                    fn(*args, **kwargs)
+                except tk.TclError:
+                    # The widget went away (e.g. while closing)
+                    pass
+                except Exception:
+                    # One broken callback must not stop every later UI update
+                    logging.getLogger("pinterest_gui").exception("UI callback %r failed", fn)
+        finally:
+            if not self._closed:
+                self.widget.after(self.interval_ms, self._drain)
+
+class LogView:
+    """
+    Ring-buffered log on top of a tk.Text: keeps at most `max_lines` lines and writes
+    pending messages in one batch per flush(), so long runs cost neither memory nor
+    UI time. write() is thread-safe and also mirrors each line to `logger` if given.
+    """
+
+    def __init__(self, text: tk.Text, max_lines: int = LOG_MAX_LINES, logger: Optional[logging.Logger] = None):
+        self.text = text
+        self.max_lines = max_lines
+        self.logger = logger
+        self._pending: deque = deque()
+        self._lines = 0
+
+    def write(self, msg: str) -> None:
+        self._pending.append(msg)
+        if self.logger is not None:
+            self.logger.info(msg)
+
+    def flush(self) -> None:
+        """Write pending lines and trim the oldest ones; Tk thread only."""
+        n = len(self._pending)
+        if not n:
+            return
+        batch = [self._pending.popleft() for _ in range(n)]
+        # Lines that would be trimmed straight away are never inserted
+        batch = batch[-self.max_lines:]
+        follow = self.text.yview()[1] >= 0.999
+        self.text.insert(tk.END, "\n".join(batch) + "\n")
+        self._lines += len(batch)
+        if self._lines > self.max_lines:
+            self.text.delete("1.0", f"{self._lines - self.max_lines + 1}.0")
+            self._lines = self.max_lines
+        # Only auto-scroll when the user hasn't scrolled up to read older lines
+        if follow:
+            self.text.see(tk.END)
+
+class ThumbnailCache:
+    """
+    Tk images of media thumbnails for the Database tab, keyed by file path.
+
+    Thumbnails are rendered in a small process pool into the on-disk cache of
+    pinterest_postprocess (keyed by path + mtime), read off the Tk thread, and only the
+    small PNG is turned into a PhotoImage on the Tk thread. At most `max_images` are
+    kept, least recently used first out. Tk thread only, except where noted.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ui: UIQueue, bg: LoopThread, workers: int = THUMB_WORKERS, max_images: int = THUMB_MAX_IMAGES):
+        self.ui = ui
+        self.bg = bg
+        self.max_images = max_images
+        self.processor = PostProcessor(tasks=(), workers=workers)
+        self._images: "OrderedDict[str, Any]" = OrderedDict()
+        self._waiters: Dict[str, List[Callable[[Optional[tk.PhotoImage]], None]]] = {}
+        self._wanted: set = set()
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def get(self, path: str) -> Optional[tk.PhotoImage]:
+        image = self._images.get(path)
+        if image is None:
+            return None
+        self._images.move_to_end(path)
+        return None if image is self._MISSING else image
+
+    def request(self, path: str, callback: Optional[Callable[[Optional[tk.PhotoImage]], None]] = None) -> None:
+        """Load `path`'s thumbnail in the background; `callback(image or None)` runs on the Tk thread."""
+        if path in self._images:
+            if callback:
+                callback(self.get(path))
+            return
+        self._wanted.add(path)
+        if path in self._waiters:
+            if callback:
+                self._waiters[path].append(callback)
+            return
+        self._waiters[path] = [callback] if callback else []
+        self.bg.submit(self._load(path))
+
+    def prefetch(self, paths: List[str]) -> None:
+        """Load these thumbnails; queued loads for paths no longer wanted are dropped."""
+        self._wanted = set(paths) | {p for p, cbs in self._waiters.items() if cbs}
+        for path in paths:
+            self.request(path)
+
+    def close(self) -> None:
+        self.processor.close()
+
+    async def _load(self, path: str) -> None:
+        # Runs on the background loop
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.processor.workers * 2)
+        data = None
+        async with self._sem:
+            if path in self._wanted:
+                try:
+                    thumb = await asyncio.to_thread(thumbnail_path, path)
+                    if not await asyncio.to_thread(os.path.exists, thumb):
+                        thumb = await self.processor.run(render_thumbnail, path)
+                    if thumb:
+                        data = await asyncio.to_thread(_read_bytes, thumb)
+                except Exception:
+                    data = None
+                self.ui.post(self._deliver, path, data)
+            else:
+                self.ui.post(self._drop, path)
 
-USER_AGENT = (
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-    "(KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
-)
+    def _drop(self, path: str) -> None:
+        for callback in self._waiters.pop(path, []):
+            callback(None)
 
-async def fetch_html(url: str) -> str:
-    import aiohttp
-    headers = {"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"}
-    timeout = aiohttp.ClientTimeout(total=30)
-    async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                return ""
-            return await resp.text()
-
-def parse_pins(html: str) -> List[Dict[str, Any]]:
-    pins: List[Dict[str, Any]] = []
-    for m in re.finditer(r'data-test-pin-id="(\d+)"', html):
-        pin_id = m.group(1)
-        start = max(0, m.start() - 2000)
-        end = min(len(html), m.end() + 2000)
-        snippet = html[start:end]
-        href_match = re.search(r'href="(/pin/\d+/)"', snippet)
-        title_match = re.search(r'aria-label="([^"]+)"', snippet)
-        pins.append({
-            "pin_id": pin_id,
-            "href": f"https://www.pinterest.com{href_match.group(1)}" if href_match else f"https://www.pinterest.com/pin/{pin_id}/",
-            "title": title_match.group(1) if title_match else None,
-        })
-    seen = set()
-    unique_pins: List[Dict[str, Any]] = []
-    for p in pins:
-        if p["pin_id"] in seen:
-            continue
-        seen.add(p["pin_id"])
-        unique_pins.append(p)
-    return unique_pins
+    def _deliver(self, path: str, data: Optional[bytes]) -> None:
+        image = self._MISSING
+        if data:
+            try:
+                image = tk.PhotoImage(data=data)
+            except tk.TclError:
+                pass
+        self._images[path] = image
+        self._images.move_to_end(path)
+        # Dropping the last reference deletes the Tk image
+        while len(self._images) > self.max_images:
+            self._images.popitem(last=False)
+        for callback in self._waiters.pop(path, []):
+            callback(self.get(path))
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def file_logger(path: str) -> logging.Logger:
+    """Logger that mirrors GUI log lines to a size-rotated file at `path`."""
+    from logging.handlers import RotatingFileHandler
+
+    logger = logging.getLogger("pinterest_gui")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+    return logger
 
 class ModernStyle:
     """Modern color scheme and styling"""
@@ -75,15 +239,28 @@ class ModernStyle:
     BORDER = "#2a2a3e"
 
 class App(ttk.Frame):
-    def __init__(self, master: tk.Tk):
+    def __init__(self, master: tk.Tk, log_file: Optional[str] = None):
         super().__init__(master)
         self.master.title("Pinterest Downloader Pro")
         self.master.geometry("1100x700")
         self.master.configure(bg=ModernStyle.BG_DARK)
         
+        # Warm browser(s) shared by every scrape; see BrowserPool for TTL/recycling
+        self.browser_pool = BrowserPool()
+        # All background work runs as coroutines on this one loop; widgets are only
+        # touched from the Tk thread through self.ui
+        self.bg = LoopThread("gui-asyncio")
+        self.ui = UIQueue(self.master)
+        self.logger = file_logger(log_file) if log_file else None
+        self._download_sem: Optional[asyncio.Semaphore] = None
+        self.thumbs = ThumbnailCache(self.ui, self.bg)
+
         # Apply modern styling
         self.setup_styles()
-        init_db()
+        # Schema setup/migrations run off the Tk thread so the window paints first;
+        # anything touching the DB awaits _wait_db()
+        self.jobs: Optional[JobQueue] = None
+        self._db_init = self.bg.submit(self._init_db())
 
         # Header
         self.build_header()
@@ -103,6 +280,28 @@ class App(ttk.Frame):
         self.build_scrape_tab()
         self.build_db_tab()
 
+        # Pick up download jobs a crashed or closed session left unfinished
+        self.bg.submit(self._resume_jobs())
+
+    async def _init_db(self):
+        try:
+            await asyncio.to_thread(init_db)
+            self.jobs = await asyncio.to_thread(JobQueue)
+        except Exception as e:
+            self.ui.post(self.log1, f"Database error: {e}")
+
+    async def _wait_db(self):
+        await asyncio.wrap_future(self._db_init)
+
+    def close(self):
+        self.ui.close()
+        # Stopping the loop cancels running jobs, which hands their leases back
+        self.bg.stop()
+        self.thumbs.close()
+        if self.jobs is not None:
+            self.jobs.close()
+        self.browser_pool.close()
+
     def setup_styles(self):
         style = ttk.Style()
         style.theme_use('clam')
@@ -251,6 +450,8 @@ class App(ttk.Frame):
         
         self.txt_log1 = self.create_modern_text(card)
         self.txt_log1.grid(row=8, column=0, columnspan=3, sticky="nsew", padx=20, pady=(0, 20))
+        self.log_view1 = LogView(self.txt_log1, logger=self.logger and self.logger.getChild("download"))
+        self.ui.add_view(self.log_view1)
         
         card.columnconfigure(1, weight=1)
         card.rowconfigure(8, weight=1)
@@ -271,34 +472,40 @@ class App(ttk.Frame):
         if not out_dir:
             messagebox.showerror("Error", "Choose download folder")
             return
-        self.btn_download.config(state=tk.DISABLED)
         self.log1(f"Starting download for: {pin}")
-        threading.Thread(target=self._download_worker, args=(pin, out_dir, name), daemon=True).start()
+        self.bg.submit(self._download_job(pin, out_dir, name))
 
-    def _download_worker(self, pin: str, out_dir: str, name: str | None):
+    async def _download_job(self, pin: str, out_dir: str, name: str | None):
+        # Several downloads can be queued from this tab; at most DOWNLOAD_CONCURRENCY run at once
+        if self._download_sem is None:
+            self._download_sem = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        await self._wait_db()
         try:
-            result = asyncio.run(download_pinterest(pin, out_dir, name))
-            if result.get("success"):
+            async with self._download_sem:
+                result = await download_pinterest(pin, out_dir, name)
+            if result.get("skipped"):
+                self.log1(f"Already downloaded: {result.get('filepath')}")
+            elif result.get("success"):
                 fp = result.get("filepath")
                 self.log1(f"Success! Saved to: {fp}")
                 pin_id = self._extract_pin_id(pin)
-                upsert_pin({
+                await asyncio.to_thread(upsert_pin, {
                     "pin_id": pin_id,
                     "href": f"https://www.pinterest.com/pin/{pin_id}/",
                     "title": name or None,
                     "description": None,
                     "media_type": result.get("type"),
-                    "media_url": None,
+                    "media_url": result.get("media_url"),
                     "file_path": fp,
+                    "file_size": result.get("file_size"),
+                    "file_hash": result.get("file_hash"),
                     "query": None,
                 })
-                self.refresh_db()
+                self.refresh_db(changed_pins=[pin_id])
             else:
                 self.log1("Download failed")
         except Exception as e:
             self.log1(f"Error: {str(e)}")
-        finally:
-            self.btn_download.config(state=tk.NORMAL)
 
     def _extract_pin_id(self, pin: str) -> str:
         m = re.search(r"/pin/(\d+)/", pin)
@@ -307,7 +514,7 @@ class App(ttk.Frame):
         return re.sub(r"\D", "", pin)
 
     def log1(self, msg: str):
-        self.txt_log1.after(0, lambda: (self.txt_log1.insert(tk.END, msg + "\n"), self.txt_log1.see(tk.END)))
+        self.log_view1.write(msg)
 
     def build_scrape_tab(self):
         frm = self.tab_scrape
@@ -350,6 +557,8 @@ class App(ttk.Frame):
         
         self.txt_log2 = self.create_modern_text(card)
         self.txt_log2.grid(row=8, column=0, columnspan=3, sticky="nsew", padx=20, pady=(0, 20))
+        self.log_view2 = LogView(self.txt_log2, logger=self.logger and self.logger.getChild("scrape"))
+        self.ui.add_view(self.log_view2)
         
         card.columnconfigure(1, weight=1)
         card.rowconfigure(8, weight=1)
@@ -376,123 +585,122 @@ class App(ttk.Frame):
             return
         self.btn_scrape_dl.config(state=tk.DISABLED)
         self.log2(f"🔍 Searching for: {q}")
-        threading.Thread(target=self._scrape_worker_selenium, args=(q, n, out_dir), daemon=True).start()
+        self.bg.submit(self._scrape_job(q, n, out_dir))
 
-    def _scrape_worker_selenium(self, q: str, n: int, out_dir: str):
+    async def _scrape_job(self, q: str, n: int, out_dir: str):
+        await self._wait_db()
         try:
-            if webdriver is None:
-                self.log2("Selenium not available. Please install selenium and Chrome driver.")
-                return
-            url = f"https://www.pinterest.com/search/videos/?q={q.replace(' ', '%20')}&rs=typed"
-
-            options = ChromeOptions()
-            options.add_argument(f"user-agent={USER_AGENT}")
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_argument("--headless=new")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--log-level=3")
-
-            driver = None
-            try:
-                # Prefer Selenium Manager (Selenium 4.6+). It auto-matches Chrome/driver.
-                driver = webdriver.Chrome(options=options)
-            except SessionNotCreatedException as e:
-                # If a pinned/cached ChromeDriver exists on PATH, Selenium Manager may still fail.
-                # Fall back to webdriver_manager only if available.
-                if ChromeDriverManager:
-                    try:
-                        service = ChromeService(ChromeDriverManager().install())
-                        driver = webdriver.Chrome(service=service, options=options)
-                    except Exception:
-                        raise e
-                else:
-                    raise
-            except WebDriverException:
-                # Generic driver startup errors: try webdriver_manager as fallback.
-                if ChromeDriverManager:
-                    service = ChromeService(ChromeDriverManager().install())
-                    driver = webdriver.Chrome(service=service, options=options)
-                else:
-                    raise
-
-            driver.get(url)
-
-            seen_ids = set()
-            collected: List[Dict[str, Any]] = []
-            last_height = 0
-            idle_rounds = 0
-            max_rounds = 60
-
-            while len(collected) < n and idle_rounds < max_rounds:
-                time.sleep(1.5)
-                html = driver.page_source
-                pins = parse_pins(html)
-                added_this_round = 0
-                for p in pins:
-                    pid = p["pin_id"]
-                    if pid in seen_ids:
-                        continue
-                    seen_ids.add(pid)
-                    collected.append(p)
-                    added_this_round += 1
-                    if len(collected) >= n:
-                        break
-                if added_this_round == 0:
-                    idle_rounds += 1
-                else:
-                    idle_rounds = 0
-
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1.0)
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    idle_rounds += 1
-                last_height = new_height
+            if not selenium_available():
+                self.log2("Selenium not available; using browserless search only.")
+            # HTTP search first; the pooled browser is only used (and launched) as a fallback
+            backend = make_search_backend("auto", self.browser_pool)
+            count, collected = await self._scrape_and_download(backend, q, n, out_dir)
 
             if not collected:
                 self.log2("⚠️ No pins found")
-
-            count = 0
-            for i, p in enumerate(collected):
-                if count >= n:
-                    break
-                self.log2(f"Downloading {i+1}/{min(n, len(collected))}: {p['pin_id']}")
-                rec = {
-                    "pin_id": p["pin_id"],
-                    "href": p.get("href"),
-                    "title": p.get("title"),
-                    "description": None,
-                    "media_type": None,
-                    "media_url": None,
-                    "file_path": None,
-                    "query": q,
-                }
-                upsert_pin(rec)
-                try:
-                    res = asyncio.run(download_pinterest(p["pin_id"], out_dir, None))
-                    if res.get("success") and res.get("filepath"):
-                        update_file_path(p["pin_id"], res["filepath"])
-                        self.log2(f"Saved: {os.path.basename(res['filepath'])}")
-                    else:
-                        self.log2(f"Failed: {p['pin_id']}")
-                except Exception as e:
-                    self.log2(f"Error: {str(e)}")
-                count += 1
-
             self.log2(f"Completed! Downloaded {count} videos")
-            self.refresh_db()
+            self.refresh_db(changed_pins=[p["pin_id"] for p in collected])
         except Exception as e:
             self.log2(f"Error: {str(e)}")
         finally:
+            self.ui.post(self.btn_scrape_dl.config, state=tk.NORMAL)
+
+    async def _scrape_and_download(self, backend, q: str, n: int, out_dir: str):
+        """
+        Search via `backend` and download pins as they are found; returns (saved, pins).
+        Found pins are queued as durable jobs first, so a crash mid-scrape is resumed
+        on the next start instead of being lost.
+        """
+        collected: List[Dict[str, Any]] = []
+        batch = uuid.uuid4().hex
+        store = await asyncio.to_thread(PinStore)
+        search_done = asyncio.Event()
+
+        async def search():
             try:
-                driver.quit()  # type: ignore
-            except Exception:
-                pass
-            self.btn_scrape_dl.config(state=tk.NORMAL)
+                async for found in backend.search(q, n):
+                    for p in found:
+                        collected.append(p)
+                        store.enqueue_upsert({
+                            "pin_id": p["pin_id"],
+                            "href": p.get("href"),
+                            "title": p.get("title"),
+                            "description": p.get("description"),
+                            "media_type": None,
+                            "media_url": None,
+                            "file_path": None,
+                            "query": q,
+                        })
+                    await asyncio.to_thread(self.jobs.enqueue, [p["pin_id"] for p in found], out_dir, q, batch)
+                    self.log2(f"Found {len(collected)}/{n} pins")
+            finally:
+                search_done.set()
+
+        self.log2(f"Scrolling and downloading ({DOWNLOAD_CONCURRENCY} downloads at a time)")
+        # Pins go to the downloaders as soon as the search queues them
+        search_task = asyncio.ensure_future(search())
+        done = 0
+        saved = 0
+        try:
+            async for res in process_jobs(self.jobs, DOWNLOAD_CONCURRENCY, batch=batch, until=search_done):
+                if res.get("requeued"):
+                    self.log2(f"Will retry {res['pin_id']}: {res.get('error') or 'download failed'}")
+                    continue
+                done += 1
+                saved += self._record_result(store, res, f"[{done}/{len(collected)}]")
+            await search_task
+        finally:
+            search_task.cancel()
+            await asyncio.to_thread(store.close)
+
+        return saved, collected
+
+    async def _resume_jobs(self):
+        """Finish the download jobs a previous session left queued or half done."""
+        await self._wait_db()
+        batch = uuid.uuid4().hex
+        try:
+            count = await asyncio.to_thread(self.jobs.adopt, batch)
+            if not count:
+                return
+            self.log2(f"↻ Resuming {count} unfinished downloads from the last session")
+            store = await asyncio.to_thread(PinStore)
+            changed: List[str] = []
+            done = 0
+            saved = 0
+            try:
+                async for res in process_jobs(self.jobs, DOWNLOAD_CONCURRENCY, batch=batch):
+                    if res.get("requeued"):
+                        continue
+                    done += 1
+                    saved += self._record_result(store, res, f"[{done}/{count}]")
+                    changed.append(res["pin_id"])
+            finally:
+                await asyncio.to_thread(store.close)
+            self.log2(f"Resumed downloads finished: {saved}/{count} saved")
+            self.refresh_db(changed_pins=changed)
+        except Exception as e:
+            self.log2(f"Error resuming downloads: {e}")
+
+    def _record_result(self, store: PinStore, res: Dict[str, Any], progress: str) -> bool:
+        """Log one download result and queue its file path; returns True if the file is on disk."""
+        if res.get("skipped"):
+            self.log2(f"{progress} Already downloaded: {os.path.basename(res['filepath'])}")
+            return True
+        if res.get("success") and res.get("filepath"):
+            store.enqueue_file_path(
+                res["pin_id"], res["filepath"], res.get("file_size"), res.get("file_hash"), res.get("media_url")
+            )
+            self.log2(f"{progress} Saved: {os.path.basename(res['filepath'])}")
+            return True
+        if res.get("error"):
+            self.log2(f"{progress} Error: {res['pin_id']}: {res['error']}")
+        else:
+            self.log2(f"{progress} Failed: {res['pin_id']}")
+        return False
 
     def log2(self, msg: str):
-        self.txt_log2.after(0, lambda: (self.txt_log2.insert(tk.END, msg + "\n"), self.txt_log2.see(tk.END)))
+        self.log_view2.write(msg)
 
     def build_db_tab(self):
         frm = self.tab_db
@@ -510,9 +718,28 @@ class App(ttk.Frame):
         self.ent_search = self.create_modern_entry(top)
         self.ent_search.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
         
-        btn_refresh = ttk.Button(top, text="Refresh", style="Secondary.TButton", command=self.refresh_db)
+        btn_refresh = ttk.Button(top, text="Refresh", style="Secondary.TButton", command=self.reload_db)
         btn_refresh.pack(side=tk.LEFT)
 
+        # Preview of the selected row's media
+        preview = tk.Frame(card, bg=ModernStyle.BG_LIGHT, width=THUMB_SIZE + 24)
+        preview.pack(side=tk.RIGHT, fill=tk.Y, padx=(0, 20), pady=(0, 20))
+        preview.pack_propagate(False)
+        # Fixed-size holder so the caption doesn't jump between placeholder text and images
+        holder = tk.Frame(preview, bg=ModernStyle.BG_LIGHT, width=THUMB_SIZE, height=THUMB_SIZE)
+        holder.pack(padx=12, pady=(12, 6))
+        holder.pack_propagate(False)
+        self.preview_image = tk.Label(holder, bg=ModernStyle.BG_LIGHT, fg=ModernStyle.TEXT_SECONDARY,
+                                      text="Select a row to preview", font=('Segoe UI', 9))
+        self.preview_image.pack(fill=tk.BOTH, expand=True)
+        self.preview_caption = tk.Label(preview, bg=ModernStyle.BG_LIGHT, fg=ModernStyle.TEXT_PRIMARY,
+                                        font=('Segoe UI', 9), justify=tk.LEFT, anchor=tk.NW,
+                                        wraplength=THUMB_SIZE)
+        self.preview_caption.pack(fill=tk.X, padx=12)
+        self._preview_path = None
+        self._preview_photo = None
+        self._prefetch_after = None
+
         # Treeview with modern styling
         tree_frame = tk.Frame(card, bg=ModernStyle.BG_MEDIUM)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
@@ -539,27 +766,195 @@ class App(ttk.Frame):
             self.tree.heading(c, text=c.replace("_", " ").title())
             self.tree.column(c, width=130, anchor=tk.W)
         
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.ent_search.bind("<Return>", lambda e: self.reload_db())
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self._show_preview())
         
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Keyset pagination state: rows are loaded a page at a time as the user scrolls
+        self._db_generation = 0
+        self._db_search = None
+        self._db_top_id = None
+        self._db_bottom_id = None
+        self._db_loaded = 0
+        self._db_exhausted = False
+        self._db_loading = False
         
         self.refresh_db()
 
-    def refresh_db(self):
-        q = self.ent_search.get().strip() if hasattr(self, 'ent_search') else None
-        rows = fetch_pins(limit=200, search=q or None)
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for r in rows:
-            self.tree.insert("", tk.END, values=(r[0], r[1], r[2], r[3], r[5], r[7], r[8], r[9]))
+    @staticmethod
+    def _db_values(r):
+        return (r[0], r[1], r[2], r[3], r[5], r[7], r[8], r[9])
+
+    def _db_query(self, query, on_done):
+        """Run a DB query off the Tk thread and hand the rows to on_done on the Tk thread."""
+        generation = self._db_generation
+
+        def deliver(rows):
+            if generation == self._db_generation:
+                on_done(rows)
+
+        async def job():
+            await self._wait_db()
+            try:
+                rows = await asyncio.to_thread(query)
+            except Exception:
+                rows = None
+            self.ui.post(deliver, rows)
+
+        self.bg.submit(job())
+
+    def reload_db(self):
+        """Drop the loaded rows and load the first page for the current search."""
+        self._db_generation += 1
+        self._db_search = self.ent_search.get().strip() or None
+        self._db_top_id = None
+        self._db_bottom_id = None
+        self._db_loaded = 0
+        self._db_exhausted = False
+        self._db_loading = False
+        self.tree.delete(*self.tree.get_children())
+        self._load_more_db()
+
+    def refresh_db(self, changed_pins=None):
+        """
+        Bring the Database tab up to date; safe to call from worker threads.
+        Only rows newer than the top row are inserted, plus in-place updates for `changed_pins`.
+        """
+        self.ui.post(self._refresh_db, changed_pins)
+
+    def _refresh_db(self, changed_pins):
+        search = self.ent_search.get().strip() or None
+        if search != self._db_search or self._db_search or self._db_top_id is None:
+            self.reload_db()
+            return
+        top_id = self._db_top_id
+        changed = list(changed_pins or [])
+
+        def query():
+            return fetch_pins_newer(top_id, limit=DB_PAGE_SIZE), fetch_pins_by_pin_id(changed) if changed else []
+
+        def apply(result):
+            if result is None:
+                return
+            newer, updated = result
+            for r in reversed(newer):
+                if not self.tree.exists(str(r[0])):
+                    self.tree.insert("", 0, iid=str(r[0]), values=self._db_values(r))
+                    self._db_loaded += 1
+            if newer:
+                self._db_top_id = max(self._db_top_id or 0, newer[0][0])
+            for r in updated:
+                if self.tree.exists(str(r[0])):
+                    self.tree.item(str(r[0]), values=self._db_values(r))
+
+        self._db_query(query, apply)
+
+    def _load_more_db(self):
+        if self._db_loading or self._db_exhausted:
+            return
+        self._db_loading = True
+        search, bottom_id, offset = self._db_search, self._db_bottom_id, self._db_loaded
+
+        def query():
+            if search:
+                return fetch_pins(limit=DB_PAGE_SIZE, search=search, offset=offset)
+            return fetch_pins_after(bottom_id, limit=DB_PAGE_SIZE)
+
+        def apply(rows):
+            self._db_loading = False
+            if rows is None:
+                return
+            for r in rows:
+                if not self.tree.exists(str(r[0])):
+                    self.tree.insert("", tk.END, iid=str(r[0]), values=self._db_values(r))
+            self._db_loaded += len(rows)
+            if rows and not search:
+                self._db_top_id = self._db_top_id or rows[0][0]
+                self._db_bottom_id = rows[-1][0]
+            if len(rows) < DB_PAGE_SIZE:
+                self._db_exhausted = True
+
+        self._db_query(query, apply)
+
+    def _on_tree_scroll(self, first, last):
+        self.tree_scrollbar.set(first, last)
+        # Fetch the next page once the view gets near the last loaded row
+        if float(last) >= DB_LOAD_MORE_AT:
+            self._load_more_db()
+        # Warm thumbnails for the rows in view once scrolling settles
+        if self._prefetch_after is not None:
+            self.after_cancel(self._prefetch_after)
+        self._prefetch_after = self.after(THUMB_PREFETCH_MS, self._prefetch_thumbnails)
+
+    def _visible_rows(self):
+        top = self.tree.identify_row(1)
+        if not top:
+            return []
+        bottom = self.tree.identify_row(max(1, self.tree.winfo_height() - 2))
+        rows, iid = [], top
+        while iid:
+            rows.append(iid)
+            if iid == bottom:
+                break
+            iid = self.tree.next(iid)
+        return rows
+
+    def _prefetch_thumbnails(self):
+        self._prefetch_after = None
+        paths = []
+        for iid in self._visible_rows():
+            path = self.tree.set(iid, "file_path")
+            if path and path != "None":
+                paths.append(path)
+        self.thumbs.prefetch(paths)
+
+    def _show_preview(self):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        values = self.tree.set(selection[0])
+        path = values.get("file_path")
+        if not path or path == "None":
+            path = None
+        self.preview_caption.configure(
+            text=f"{values.get('title') or ''}\n{values.get('media_type') or ''}  ·  {values.get('pin_id')}\n{path or 'Not downloaded'}"
+        )
+        self._preview_path = path
+        if path is None:
+            self._set_preview(None, "No file")
+            return
+        image = self.thumbs.get(path)
+        if image is not None:
+            self._set_preview(image)
+            return
+        self._set_preview(None, "Loading…")
+
+        def shown(image):
+            if self._preview_path == path:
+                self._set_preview(image, "No preview available")
+
+        self.thumbs.request(path, shown)
+
+    def _set_preview(self, image, text=""):
+        # The label keeps its own reference so LRU eviction can't blank the shown image
+        self._preview_photo = image
+        self.preview_image.configure(image=image or "", text="" if image else text)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Pinterest Downloader Pro")
+    parser.add_argument("--log-file", help="Also write the activity logs to this file (rotated at 5 MB)")
+    args = parser.parse_args()
     root = tk.Tk()
-    App(root)
-    root.mainloop()
+    app = App(root, log_file=args.log_file)
+    try:
+        root.mainloop()
+    finally:
+        app.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
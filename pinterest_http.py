@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, TypeVar, Union
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# aiohttp is imported on first use, not at module import, to keep startup fast.
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
+)
+
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Connection pool tuning: a handful of warm keep-alive connections per host
+# (pinterest.com for pages, i.pinimg.com / v.pinimg.com for media).
+LIMIT_PER_HOST = 8
+LIMIT_TOTAL = 64
+KEEPALIVE_TIMEOUT = 30
+DNS_CACHE_TTL = 300
+REQUEST_TIMEOUT = 30
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_session_owned = False
+
+
+def create_session(
+    limit_per_host: int = LIMIT_PER_HOST,
+    limit: int = LIMIT_TOTAL,
+    timeout: float = REQUEST_TIMEOUT,
+) -> aiohttp.ClientSession:
+    """
+    Build a ClientSession backed by a pooled, keep-alive connector with DNS caching.
+    Must be called from inside a running event loop.
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=DEFAULT_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared session for the running event loop, creating it on first use.
+    A session is bound to the loop it was created on, so a new loop gets a new session.
+    """
+    global _session, _session_loop, _session_owned
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or (_session_loop is not None and _session_loop is not loop):
+        _session = create_session()
+        _session_loop = loop
+        _session_owned = True
+    return _session
+
+
+def set_session(session: Optional[aiohttp.ClientSession]) -> None:
+    """Inject a caller-owned session (or None to reset) to be used by all download helpers."""
+    global _session, _session_loop, _session_owned
+    _session = session
+    _session_owned = False
+    try:
+        _session_loop = asyncio.get_running_loop() if session is not None else None
+    except RuntimeError:
+        _session_loop = None
+
+
+async def close_session() -> None:
+    """Close the shared session if this module created it; injected sessions are left to their owner."""
+    global _session, _session_loop, _session_owned
+    if _session is not None and _session_owned and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+    _session_owned = False
+
+
+def run(coro: Awaitable[T]) -> T:
+    """asyncio.run() that also closes the shared session before the loop goes away."""
+    async def _runner() -> Any:
+        try:
+            return await coro
+        finally:
+            await close_session()
+    return asyncio.run(_runner())
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def map_unordered(
+    items: Union[Iterable[T], AsyncIterable[T]],
+    fn: Callable[[T], Awaitable[R]],
+    workers: int,
+    max_pending: Optional[int] = None,
+) -> AsyncIterator[R]:
+    """
+    Await fn(item) for every item with `workers` calls in flight, yielding results in
+    completion order. Items are pulled through a queue of `max_pending` (default
+    2 * workers), so a slow stage throttles its producer instead of buffering without
+    bound. Errors from `items` or `fn` are re-raised here; closing the generator
+    cancels whatever is still running.
+    """
+    workers = max(1, workers)
+    done = object()
+    todo: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max_pending or workers * 2)
+    results: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    async def feed() -> None:
+        try:
+            if isinstance(items, AsyncIterable):
+                async for item in items:
+                    await todo.put(item)
+            else:
+                for item in items:
+                    await todo.put(item)
+        finally:
+            for _ in range(workers):
+                await todo.put(done)
+
+    async def work() -> None:
+        try:
+            while True:
+                item = await todo.get()
+                if item is done:
+                    return
+                try:
+                    res = await fn(item)
+                except Exception as e:
+                    res = _Failed(e)
+                await results.put(res)
+        finally:
+            await results.put(done)
+
+    feeder = asyncio.ensure_future(feed())
+    tasks = [asyncio.ensure_future(work()) for _ in range(workers)]
+    try:
+        running = workers
+        while running:
+            res = await results.get()
+            if res is done:
+                running -= 1
+            elif isinstance(res, _Failed):
+                raise res.error
+            else:
+                yield res
+        await feeder
+    finally:
+        feeder.cancel()
+        for t in tasks:
+            t.cancel()
+
+
+class LoopThread:
+    """
+    One long-lived event loop on a daemon thread, for programs (like the GUI) whose main
+    thread is busy with something else. Other threads hand it coroutines with submit();
+    the shared session and its warm connections live as long as the loop does.
+    """
+
+    def __init__(self, name: str = "asyncio-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, starting the thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._main, args=(ready,), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def _main(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            # Cancel whatever is still running, then close the session on its own loop
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(close_session())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def submit(self, coro: Awaitable[T]) -> concurrent.futures.Future[T]:
+        """Schedule `coro` on the loop from any thread; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Cancel pending work, close the shared session and join the thread."""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            self._thread = None
+        if thread is None or loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+# Rate limiting and retries
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts to the server (AIMD): every throttled response halves
+    the rate and pauses the bucket for Retry-After; every success adds `increase` back,
+    up to `max_rate`. Safe to share between threads and event loops.
+    """
+
+    def __init__(self, rate: float, max_rate: float, min_rate: float = 0.2, burst: float = 4.0, increase: float = 0.1):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase = increase
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token (possibly going into debt) and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    async def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host family: pinterest.com pages vs pinimg.com media."""
+
+    # host suffix -> (initial rate, max rate) in requests per second
+    RATES = {
+        "pinterest.com": (4.0, 8.0),
+        "pinimg.com": (16.0, 32.0),
+    }
+    DEFAULT_RATE = (8.0, 16.0)
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def host_key(cls, url: str) -> str:
+        host = (urlsplit(url).hostname or "").lower()
+        for suffix in cls.RATES:
+            if host == suffix or host.endswith("." + suffix):
+                return suffix
+        return host
+
+    def bucket(self, url: str) -> TokenBucket:
+        key = self.host_key(url)
+        with self._lock:
+            if key not in self._buckets:
+                rate, max_rate = self.RATES.get(key, self.DEFAULT_RATE)
+                self._buckets[key] = TokenBucket(rate, max_rate)
+            return self._buckets[key]
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, and which failures are worth retrying."""
+
+    RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+    THROTTLE_STATUS = frozenset({429, 503})
+
+    def __init__(self, attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based); Retry-After wins if larger."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            return min(self.max_delay, max(backoff, retry_after))
+        return backoff
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.RETRYABLE_STATUS
+
+    @staticmethod
+    def is_retryable_error(exc: BaseException) -> bool:
+        import aiohttp
+
+        return isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+RATE_LIMITER = HostRateLimiter()
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+@asynccontextmanager
+async def fetch(
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    method: str = "GET",
+    policy: Optional[RetryPolicy] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    **kwargs: Any,
+) -> AsyncIterator[aiohttp.ClientResponse]:
+    """
+    `async with fetch(url) as resp:` -- a rate-limited, retrying session.request().
+
+    Connection errors and retryable statuses (429/5xx...) are retried per `policy`;
+    429/503 also slow down that host's bucket. The final response is yielded whatever
+    its status, so callers keep their own status handling.
+    """
+    session = session or await get_session()
+    policy = policy or DEFAULT_RETRY_POLICY
+    bucket = (limiter or RATE_LIMITER).bucket(url)
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        try:
+            resp = await session.request(method, url, **kwargs)
+        except Exception as e:
+            if attempt + 1 < policy.attempts and policy.is_retryable_error(e):
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            raise
+        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        if resp.status in policy.THROTTLE_STATUS:
+            bucket.throttled(retry_after)
+        elif resp.status < 400:
+            bucket.succeeded()
+        if policy.is_retryable_status(resp.status) and attempt + 1 < policy.attempts:
+            resp.release()
+            await asyncio.sleep(policy.delay(attempt, retry_after))
+            attempt += 1
+            continue
+        break
+    try:
+        yield resp
+    finally:
+        resp.release()
@@ -0,0 +1,166 @@
+"""
+Durable download worker over the jobs table in pinterest_scraper.db:
+
+    python -m pinterest_jobs add -o downloads 980166306379767499 https://www.pinterest.com/pin/123/
+    python -m pinterest_jobs run -c 8
+    python -m pinterest_jobs status
+
+`run` works through queued jobs and picks up whatever a crashed GUI, CLI or worker left
+unfinished; jobs already done are not repeated. Results are printed as JSON lines.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from code_download import DEFAULT_CONCURRENCY, _download_one, extract_pin_id
+from pinterest_cli import download_record, print_json_lines, read_lines
+from pinterest_db import JobQueue, PinStore
+from pinterest_http import DEFAULT_RETRY_POLICY
+
+POLL_INTERVAL = 0.5
+
+
+async def process_jobs(
+    jobs: JobQueue,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    batch: Optional[str] = None,
+    until: Optional[asyncio.Event] = None,
+    db_path: Optional[str] = None,
+    poll_interval: float = POLL_INTERVAL,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Claim and download jobs with `concurrency` workers, yielding each download_pinterest()
+    result plus 'job_id', 'pin_id', 'query', 'attempt' and 'requeued' as it finishes.
+
+    Only jobs in `batch` are taken (any job when None). Stops once nothing is queued or
+    in flight; with `until`, keeps polling for newly enqueued jobs until it is set.
+    Leases are renewed while jobs run and handed back if the generator is cancelled.
+    """
+    await asyncio.to_thread(jobs.recover)
+    results: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    in_flight: Dict[int, Dict[str, Any]] = {}
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(jobs.lease / 3)
+            await asyncio.to_thread(jobs.renew, list(in_flight))
+
+    loop = asyncio.get_running_loop()
+
+    async def run_one(job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        in_flight[job_id] = job
+
+        def on_stage(stage: str) -> None:
+            # Plain callback: hand the DB write to a thread instead of blocking the loop
+            # (a late mark is a no-op once done()/fail() cleared the lease)
+            loop.run_in_executor(None, jobs.mark, job_id, stage)
+
+        try:
+            res = await _download_one(job["pin_id"], job["save_location"], db_path=db_path, on_stage=on_stage)
+        except BaseException:
+            await asyncio.to_thread(jobs.release, [job_id])
+            in_flight.pop(job_id, None)
+            raise
+        requeued = False
+        if res.get("success"):
+            await asyncio.to_thread(jobs.done, job_id, res.get("filepath"))
+        else:
+            retry_in = DEFAULT_RETRY_POLICY.delay(job["attempts"])
+            requeued = await asyncio.to_thread(jobs.fail, job_id, res.get("error") or "download failed", retry_in)
+        in_flight.pop(job_id, None)
+        results.put_nowait(dict(res, job_id=job_id, query=job["query"], attempt=job["attempts"], requeued=requeued))
+
+    async def worker() -> None:
+        while True:
+            claimed = await asyncio.to_thread(jobs.claim, 1, batch)
+            if claimed:
+                await run_one(claimed[0])
+                continue
+            # Nothing runnable right now: wait if more work can still show up
+            waiting = (until is not None and not until.is_set()) or bool(in_flight)
+            if not waiting:
+                waiting = (await asyncio.to_thread(jobs.counts, batch))["queued"] > 0
+            if not waiting:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def supervise() -> None:
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            results.put_nowait(None)
+
+    hb = asyncio.ensure_future(heartbeat())
+    sup = asyncio.ensure_future(supervise())
+    try:
+        while True:
+            res = await results.get()
+            if res is None:
+                break
+            yield res
+        await sup
+    finally:
+        sup.cancel()
+        hb.cancel()
+        await asyncio.gather(sup, hb, return_exceptions=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pinterest_jobs", description="Durable Pinterest download queue")
+    parser.add_argument("--db", help="SQLite database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="Queue pins for download")
+    p_add.add_argument("pins", nargs="*", help="Pin IDs or pin URLs ('-' reads them from stdin)")
+    p_add.add_argument("-f", "--file", help="File with one pin ID or URL per line")
+    p_add.add_argument("-o", "--output", default="downloads", help="Directory to save files in")
+    p_add.add_argument("-q", "--query", help="Query to record with the jobs")
+
+    p_run = sub.add_parser("run", help="Download queued and unfinished jobs")
+    p_run.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                       help="Maximum number of simultaneous downloads")
+
+    sub.add_parser("status", help="Show job counts by state")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        pins = [p for p in args.pins if p != "-"]
+        if "-" in args.pins:
+            pins.extend(read_lines(sys.stdin))
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as f:
+                pins.extend(read_lines(f))
+        if not pins:
+            parser.error("no pins given")
+        with JobQueue(args.db) as jobs:
+            added = jobs.enqueue([extract_pin_id(p) for p in pins], args.output, query=args.query)
+        print(f"Queued {added} jobs", file=sys.stderr)
+        return 0
+
+    if args.command == "status":
+        with JobQueue(args.db) as jobs:
+            print(json.dumps(jobs.counts()))
+        return 0
+
+    async def results() -> AsyncIterator[Dict[str, Any]]:
+        jobs = await asyncio.to_thread(JobQueue, args.db)
+        try:
+            store = await asyncio.to_thread(PinStore, args.db)
+            try:
+                async for res in process_jobs(jobs, concurrency=args.concurrency, db_path=args.db):
+                    if res.get("success") and not res.get("skipped"):
+                        store.enqueue_upsert(download_record(res, res.get("query")))
+                    yield res
+            finally:
+                await asyncio.to_thread(store.close)
+        finally:
+            await asyncio.to_thread(jobs.close)
+
+    return print_json_lines(results, ok=lambda res: bool(res.get("success") or res.get("requeued")))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+CPU-bound post-processing of finished downloads in a process pool.
+
+    processor = PostProcessor([probe_media, make_thumbnail])
+    async for res in postprocess_stream(download_stream(...), processor):
+        ...  # res now also has 'width', 'height', 'duration', 'thumbnail', ...
+
+Tasks are plain top-level functions taking a download result dict and returning extra
+fields, so they can be pickled to worker processes. A bounded queue sits in front of
+the pool: when it is full, the stage stops pulling results instead of piling up work,
+and the event loop keeps serving network I/O.
+
+This module is imported by pool workers, so it must stay free of GUI imports (aiohttp is
+only loaded by pinterest_http on first use, so importing map_unordered is cheap).
+Pillow (thumbnails) and ffmpeg (video poster frames) are optional.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pinterest_http import map_unordered
+
+Task = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+THUMB_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".thumbs")
+THUMB_SIZE = 256
+PROBE_BYTES = 64 * 1024
+
+
+# Tasks (run in worker processes)
+
+def _image_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a PNG / GIF / WebP / JPEG header, without decoding the image."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", head[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            b = head[21:25]
+            return 1 + (((b[1] & 0x3F) << 8) | b[0]), 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+        if chunk == b"VP8X":
+            return 1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little")
+    if head.startswith(b"\xff\xd8"):
+        i = 2
+        while i + 9 < len(head):
+            if head[i] != 0xFF:
+                i += 1
+                continue
+            marker = head[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            length = struct.unpack(">H", head[i + 2:i + 4])[0]
+            # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", head[i + 5:i + 9])
+                return w, h
+            i += 2 + length
+    return None
+
+
+def _mp4_info(path: str) -> Dict[str, Any]:
+    """Duration from moov/mvhd and the first non-zero track size from trak/tkhd."""
+    info: Dict[str, Any] = {}
+
+    def boxes(f, start: int, end: int):
+        pos = start
+        while pos + 8 <= end:
+            f.seek(pos)
+            header = f.read(16)
+            if len(header) < 8:
+                return
+            size, kind = struct.unpack(">I4s", header[:8])
+            hdr = 8
+            if size == 1 and len(header) >= 16:
+                size, hdr = struct.unpack(">Q", header[8:16])[0], 16
+            elif size == 0:
+                size = end - pos
+            if size < hdr:
+                return
+            yield kind, pos + hdr, pos + size
+            pos += size
+
+    with open(path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        for kind, body, box_end in boxes(f, 0, end):
+            if kind != b"moov":
+                continue
+            for sub, sub_body, sub_end in boxes(f, body, box_end):
+                if sub == b"mvhd":
+                    f.seek(sub_body)
+                    data = f.read(32)
+                    if data[0] == 1:
+                        timescale, duration = struct.unpack(">IQ", data[20:32])
+                    else:
+                        timescale, duration = struct.unpack(">II", data[12:20])
+                    if timescale:
+                        info["duration"] = round(duration / timescale, 3)
+                elif sub == b"trak" and "width" not in info:
+                    for leaf, leaf_body, leaf_end in boxes(f, sub_body, sub_end):
+                        if leaf != b"tkhd":
+                            continue
+                        f.seek(leaf_end - 8)
+                        w, h = struct.unpack(">II", f.read(8))
+                        if w and h:
+                            info["width"], info["height"] = w >> 16, h >> 16
+            break
+    return info
+
+
+def probe_media(res: Dict[str, Any]) -> Dict[str, Any]:
+    """Width/height (and duration for MP4) read from the file's headers."""
+    path = res["filepath"]
+    if res.get("type") == "video" or path.lower().endswith(".mp4"):
+        return _mp4_info(path)
+    with open(path, "rb") as f:
+        size = _image_size(f.read(PROBE_BYTES))
+    return {"width": size[0], "height": size[1]} if size else {}
+
+
+def thumbnail_path(path: str, size: int = THUMB_SIZE, cache_dir: str = THUMB_CACHE_DIR) -> str:
+    """Cache file for `path`'s thumbnail; the key includes mtime and size, so edits invalidate it."""
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}:{size}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest + ".png")
+
+
+def render_thumbnail(path: str, size: int = THUMB_SIZE, cache_dir: str = THUMB_CACHE_DIR) -> Optional[str]:
+    """
+    Create (or reuse) a PNG thumbnail of an image, or of a video's poster frame when
+    ffmpeg is available. Returns the cached thumbnail path, or None if it can't be made.
+    """
+    out = thumbnail_path(path, size, cache_dir)
+    if os.path.exists(out):
+        return out
+    try:
+        from PIL import Image  # type: ignore
+    except ImportError:
+        Image = None  # type: ignore
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    try:
+        if path.lower().endswith(".mp4"):
+            ffmpeg = shutil.which("ffmpeg")
+            if not ffmpeg:
+                return None
+            # Seek a little in to skip black leading frames; scale keeps the aspect ratio
+            subprocess.run(
+                [ffmpeg, "-v", "error", "-y", "-ss", "1", "-i", path, "-frames:v", "1",
+                 "-vf", f"scale='min({size},iw)':-2", "-f", "image2", "-c:v", "png", tmp],
+                check=True, timeout=60, stdin=subprocess.DEVNULL,
+            )
+            if not os.path.exists(tmp) or Image is None:
+                if os.path.exists(tmp):
+                    os.replace(tmp, out)
+                    return out
+                return None
+            source = tmp
+        elif Image is None:
+            return None
+        else:
+            source = path
+        with Image.open(source) as im:
+            im.draft("RGB", (size, size))
+            im.thumbnail((size, size))
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA")
+            im.save(tmp + ".png", "PNG")
+        os.replace(tmp + ".png", out)
+        return out
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+    finally:
+        for leftover in (tmp, tmp + ".png"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def make_thumbnail(res: Dict[str, Any]) -> Dict[str, Any]:
+    thumb = render_thumbnail(res["filepath"])
+    return {"thumbnail": thumb} if thumb else {}
+
+
+DEFAULT_TASKS: Tuple[Task, ...] = (probe_media, make_thumbnail)
+
+
+def _run_tasks(tasks: Sequence[Task], res: Dict[str, Any]) -> Dict[str, Any]:
+    extra: Dict[str, Any] = {}
+    errors: List[str] = []
+    for task in tasks:
+        try:
+            extra.update(task(res))
+        except Exception as e:
+            errors.append(f"{task.__name__}: {e}")
+    if errors:
+        extra["postprocess_errors"] = errors
+    return extra
+
+
+# Pool and pipeline stage (run in the event-loop process)
+
+class PostProcessor:
+    """
+    Runs `tasks` on finished downloads in a ProcessPoolExecutor of `workers` processes
+    (started on first use). At most `max_pending` results are queued or in the pool.
+    """
+
+    def __init__(self, tasks: Sequence[Task] = DEFAULT_TASKS, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.tasks = tuple(tasks)
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_pending = max_pending or self.workers * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "PostProcessor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run any picklable function in the pool (e.g. a single render_thumbnail call)."""
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+
+    async def process(self, res: Dict[str, Any]) -> Dict[str, Any]:
+        """Result with the tasks' fields merged in; failed downloads pass straight through."""
+        if not res.get("success") or not res.get("filepath") or not self.tasks:
+            return res
+        try:
+            extra = await self.run(_run_tasks, self.tasks, res)
+        except Exception as e:
+            extra = {"postprocess_errors": [str(e) or type(e).__name__]}
+        return {**res, **extra}
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+async def postprocess_stream(
+    results: AsyncIterable[Dict[str, Any]],
+    processor: PostProcessor,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Pipeline stage: pass every result through `processor`, yielding in completion order.
+    Results wait in a queue of processor.max_pending; while it is full, `results` is not
+    consumed, so the CPU stage throttles its producer instead of growing without bound.
+    """
+    async for res in map_unordered(results, processor.process, processor.workers, processor.max_pending):
+        yield res
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from code_download import DEFAULT_CONCURRENCY, download_stream
+from pinterest_browser import BrowserPool
+from pinterest_db import PinStore
+from pinterest_http import run
+from pinterest_scraper import SEARCH_BACKENDS, make_search_backend
+
+DEFAULT_BROWSERS = 2
+
+
+def _new_stats() -> Dict[str, Any]:
+    return {"found": 0, "duplicates": 0, "saved": 0, "skipped": 0, "failed": 0, "done": False, "error": None}
+
+
+async def run_jobs(
+    jobs: Iterable[Tuple[str, int]],
+    out_dir: str,
+    browsers: int = DEFAULT_BROWSERS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    backend="auto",
+    db_path: Optional[str] = None,
+    on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Scrape many (query, n) jobs, at most `browsers` at a time, into one shared download stage.
+
+    A pin found by several queries is downloaded once and recorded under the first query
+    that found it (pins.query). `backend` is a search backend object or one of
+    SEARCH_BACKENDS; browsers are only launched if the Selenium path is actually used.
+
+    Returns per-query stats. on_progress(query, stats) is called whenever a query's
+    numbers change, and on_result(query, result) for every finished download.
+    """
+    jobs = list(jobs)
+    # Opening the store creates the schema and starts its writer thread; keep it off the loop
+    store = await asyncio.to_thread(PinStore, db_path)
+    pool = None
+    if isinstance(backend, str):
+        pool = BrowserPool(size=browsers)
+        backend = make_search_backend(backend, pool)
+    stats: Dict[str, Dict[str, Any]] = {q: _new_stats() for q, _ in jobs}
+    owner: Dict[str, str] = {}
+    found: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(max(1, browsers))
+
+    def report(query: str) -> None:
+        if on_progress:
+            on_progress(query, stats[query])
+
+    async def scrape(query: str, n: int) -> None:
+        async with slots:
+            try:
+                async for batch in backend.search(query, n):
+                    for p in batch:
+                        if p["pin_id"] in owner:
+                            stats[query]["duplicates"] += 1
+                            continue
+                        owner[p["pin_id"]] = query
+                        stats[query]["found"] += 1
+                        store.enqueue_upsert({
+                            "pin_id": p["pin_id"],
+                            "href": p.get("href"),
+                            "title": p.get("title"),
+                            "description": p.get("description"),
+                            "media_type": None,
+                            "media_url": None,
+                            "file_path": None,
+                            "query": query,
+                        })
+                        await found.put(p["pin_id"])
+                    report(query)
+            except Exception as e:
+                stats[query]["error"] = str(e)
+            finally:
+                stats[query]["done"] = True
+                report(query)
+
+    async def scrapers() -> None:
+        await asyncio.gather(*(scrape(q, n) for q, n in jobs))
+        await found.put(None)
+
+    async def pin_ids() -> AsyncIterator[str]:
+        while True:
+            pin_id = await found.get()
+            if pin_id is None:
+                return
+            yield pin_id
+
+    producer = asyncio.ensure_future(scrapers())
+    try:
+        async for res in download_stream(pin_ids(), out_dir, concurrency=concurrency, db_path=db_path):
+            query = owner[res["pin_id"]]
+            if on_result:
+                on_result(query, res)
+            if res.get("skipped"):
+                stats[query]["skipped"] += 1
+            elif res.get("success") and res.get("filepath"):
+                store.enqueue_file_path(
+                    res["pin_id"], res["filepath"], res.get("file_size"), res.get("file_hash"), res.get("media_url")
+                )
+                stats[query]["saved"] += 1
+            else:
+                stats[query]["failed"] += 1
+            report(query)
+        await producer
+    finally:
+        producer.cancel()
+        try:
+            # close() waits for the writer to flush the queued upserts
+            await asyncio.to_thread(store.close)
+        finally:
+            if pool is not None:
+                pool.close()
+    return stats
+
+
+def parse_job(text: str, default_n: int) -> Tuple[str, int]:
+    """'cats:50' -> ('cats', 50); a bare query uses default_n."""
+    query, sep, count = text.rpartition(":")
+    if sep and count.strip().isdigit() and query.strip():
+        return query.strip(), int(count)
+    return text.strip(), default_n
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Scrape and download many Pinterest searches without the GUI")
+    parser.add_argument("queries", nargs="*", help="Search queries, optionally as 'query:count'")
+    parser.add_argument("-f", "--file", help="File with one 'query:count' job per line")
+    parser.add_argument("-n", "--count", type=int, default=20, help="Pins per query when no count is given")
+    parser.add_argument("-o", "--output", default="downloads", help="Directory to save files in")
+    parser.add_argument("-k", "--browsers", type=int, default=DEFAULT_BROWSERS, help="Parallel browser sessions")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of simultaneous downloads")
+    parser.add_argument("--backend", choices=SEARCH_BACKENDS, default="auto",
+                        help="How to search: HTTP resource API, Selenium, or HTTP with Selenium fallback")
+    parser.add_argument("--db", help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    lines = list(args.queries)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            lines.extend(line for line in f if line.strip() and not line.lstrip().startswith("#"))
+    jobs = [parse_job(line, args.count) for line in lines]
+    if not jobs:
+        parser.error("no queries given")
+
+    def progress(query: str, s: Dict[str, Any]) -> None:
+        state = "done" if s["done"] else "running"
+        print(f"[{query}] {state}: found {s['found']}, saved {s['saved']}, "
+              f"skipped {s['skipped']}, failed {s['failed']}, duplicates {s['duplicates']}"
+              + (f", error: {s['error']}" if s["error"] else ""))
+
+    stats = run(run_jobs(jobs, args.output, browsers=args.browsers, concurrency=args.concurrency,
+                         backend=args.backend, db_path=args.db, on_progress=progress))
+    total = sum(s["saved"] + s["skipped"] for s in stats.values())
+    print(f"Done: {total} pins across {len(stats)} queries")
+
+
+if __name__ == "__main__":
+    main()
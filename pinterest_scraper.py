@@ -0,0 +1,452 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from urllib.parse import quote
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set
+
+PIN_BASE_URL = "https://www.pinterest.com"
+
+
+def search_url(query: str) -> str:
+    """Video search results page for `query`."""
+    return f"{PIN_BASE_URL}/search/videos/?q={quote(query)}&rs=typed"
+
+# Pin marker, link and title in one pattern, so a page is scanned exactly once. It is
+# anchored on the '="' every attribute shares (a literal prefix re can search for
+# quickly) and the attribute name is checked by lookbehind.
+PIN_ATTRS_RE = re.compile(
+    r'="(?:(?<=data-test-pin-id=")(?P<id>\d+)"|(?<=href=")(?P<href>/pin/\d+/)"|(?<=aria-label=")(?P<title>[^"]+)")'
+)
+
+# How far after a pin marker its link and title may appear
+PIN_ATTR_WINDOW = 4000
+
+# Returns [[pin_id, href, title], ...] for pin cards not returned before in this page,
+# straight from the DOM, so the page never has to be serialized.
+PINS_FROM_DOM_JS = """
+const seen = window.__pdpSeenPins || (window.__pdpSeenPins = new Set());
+const out = [];
+for (const el of document.querySelectorAll('[data-test-pin-id]')) {
+    const id = el.getAttribute('data-test-pin-id');
+    if (!id || seen.has(id)) continue;
+    seen.add(id);
+    const a = el.querySelector('a[href*="/pin/"]');
+    const t = el.querySelector('[aria-label]');
+    out.push([id, a ? a.getAttribute('href') : null, t ? t.getAttribute('aria-label') : null]);
+}
+return out;
+"""
+
+# Counts DOM insertions under <body>, so the scroller can wait for Pinterest to render
+# the next batch instead of sleeping a fixed time. Returns [mutations, scrollHeight].
+WATCH_MUTATIONS_JS = """
+if (!window.__pdpObserver) {
+    window.__pdpMutations = 0;
+    window.__pdpObserver = new MutationObserver(function (records) {
+        for (const r of records) { window.__pdpMutations += r.addedNodes.length; }
+    });
+    window.__pdpObserver.observe(document.body, {childList: true, subtree: true});
+}
+return [window.__pdpMutations, document.body.scrollHeight];
+"""
+
+SCROLL_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+
+def _pin_record(pin_id: str, href: Optional[str], title: Optional[str]) -> Dict[str, Any]:
+    if href and href.startswith("/"):
+        href = f"{PIN_BASE_URL}{href}"
+    return {
+        "pin_id": pin_id,
+        "href": href or f"{PIN_BASE_URL}/pin/{pin_id}/",
+        "title": title or None,
+    }
+
+
+def iter_pins(html: str, known: Optional[Set[str]] = None) -> Iterable[Dict[str, Any]]:
+    """
+    Yield {'pin_id', 'href', 'title'} for each pin marker in `html`, in page order,
+    skipping IDs in `known` (and repeats within the page).
+
+    One finditer over PIN_ATTRS_RE walks the page: a marker opens a pin, and the first
+    link and title after it (up to the next marker, within PIN_ATTR_WINDOW) are attached.
+    """
+    seen = set(known) if known else set()
+    pin_id = href = title = None
+    end = 0
+    for m in PIN_ATTRS_RE.finditer(html):
+        kind = m.lastgroup
+        if kind == "id":
+            if pin_id is not None:
+                yield _pin_record(pin_id, href, title)
+            pin_id = href = title = None
+            if m.group("id") not in seen:
+                pin_id = m.group("id")
+                seen.add(pin_id)
+                end = m.end() + PIN_ATTR_WINDOW
+        elif pin_id is None or m.start() >= end:
+            continue
+        elif kind == "href":
+            href = href or m.group("href")
+        else:
+            title = title or m.group("title")
+    if pin_id is not None:
+        yield _pin_record(pin_id, href, title)
+
+
+def parse_pins(html: str) -> List[Dict[str, Any]]:
+    """All unique pins on a page, in page order."""
+    return list(iter_pins(html))
+
+
+class IncrementalPinParser:
+    """
+    Remembers pins already returned so each scroll round only yields new ones.
+
+    from_driver() asks the browser for new pin cards via a DOM query and only falls
+    back to serializing driver.page_source when script execution fails.
+    """
+
+    def __init__(self, use_dom: bool = True):
+        self.known: Set[str] = set()
+        self.use_dom = use_dom
+
+    def feed(self, html: str) -> List[Dict[str, Any]]:
+        pins = list(iter_pins(html, self.known))
+        self.known.update(p["pin_id"] for p in pins)
+        return pins
+
+    def from_driver(self, driver) -> List[Dict[str, Any]]:
+        if self.use_dom:
+            try:
+                rows = driver.execute_script(PINS_FROM_DOM_JS)
+            except Exception:
+                self.use_dom = False
+            else:
+                pins = []
+                for pin_id, href, title in rows or []:
+                    if pin_id in self.known:
+                        continue
+                    self.known.add(pin_id)
+                    pins.append(_pin_record(pin_id, href, title))
+                return pins
+        return self.feed(driver.page_source)
+
+
+class ScrollPolicy:
+    """
+    Timing for scroll_pins(). Each round waits up to `timeout` for the page to change;
+    rounds that add no pins grow the timeout by `backoff` (capped at `max_timeout`), and
+    the scroll stops after `max_idle_rounds` such rounds in a row.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 2.0,
+        max_timeout: float = 8.0,
+        backoff: float = 1.6,
+        max_idle_rounds: int = 3,
+        poll_interval: float = 0.15,
+        settle: float = 0.3,
+    ):
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.backoff = backoff
+        self.max_idle_rounds = max_idle_rounds
+        self.poll_interval = poll_interval
+        self.settle = settle
+
+
+def wait_for_page_change(
+    driver, timeout: float, policy: ScrollPolicy, stop: Optional[threading.Event] = None
+) -> bool:
+    """
+    Block until the DOM gains nodes or grows taller (then give it `settle` seconds to
+    finish rendering that batch), or until `timeout` passes or `stop` is set. Returns
+    whether it changed.
+    """
+    stop = stop or threading.Event()
+    start = driver.execute_script(WATCH_MUTATIONS_JS)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if stop.wait(policy.poll_interval):
+            return False
+        if driver.execute_script(WATCH_MUTATIONS_JS) != start:
+            stop.wait(policy.settle)
+            return True
+    return False
+
+
+def scroll_pins(
+    driver,
+    n: int,
+    parser: Optional[IncrementalPinParser] = None,
+    policy: Optional[ScrollPolicy] = None,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Scroll the loaded search page and yield each batch of newly found pins as soon as
+    it appears, until `n` pins were yielded, the page stops producing new ones or
+    `stop` is set. Once `stop` is set the driver is not touched again.
+    """
+    stop = stop or threading.Event()
+    parser = parser or IncrementalPinParser()
+    policy = policy or ScrollPolicy()
+    remaining = n
+    idle_rounds = 0
+    timeout = policy.timeout
+
+    driver.execute_script(WATCH_MUTATIONS_JS)
+    pins = parser.from_driver(driver)
+    while remaining > 0:
+        if pins:
+            batch = pins[:remaining]
+            remaining -= len(batch)
+            idle_rounds = 0
+            timeout = policy.timeout
+            yield batch
+            if remaining <= 0:
+                return
+        else:
+            idle_rounds += 1
+            if idle_rounds >= policy.max_idle_rounds:
+                return
+            timeout = min(timeout * policy.backoff, policy.max_timeout)
+
+        if stop.is_set():
+            return
+        driver.execute_script(SCROLL_JS)
+        wait_for_page_change(driver, timeout, policy, stop)
+        if stop.is_set():
+            return
+        pins = parser.from_driver(driver)
+
+
+async def scroll_pins_async(
+    driver,
+    n: int,
+    parser: Optional[IncrementalPinParser] = None,
+    policy: Optional[ScrollPolicy] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    scroll_pins() driven from a helper thread, so the blocking Selenium calls run while
+    the event loop keeps downloading. Batches are handed over as soon as they are found.
+    When the generator finishes or is closed, the thread is stopped and joined, so the
+    driver is free to be reused.
+    """
+    loop = asyncio.get_running_loop()
+    batches: "asyncio.Queue[Any]" = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def post(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(batches.put_nowait, item)
+        except RuntimeError:
+            # The loop already closed; nobody is listening any more
+            pass
+
+    def produce() -> None:
+        try:
+            for batch in scroll_pins(driver, n, parser, policy, stop):
+                post(batch)
+        except BaseException as e:
+            post(e)
+        post(done)
+
+    thread = threading.Thread(target=produce, name="ScrollPins", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await batches.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        await asyncio.to_thread(thread.join)
+
+
+class SeleniumSearch:
+    """
+    Search backend that scrolls the search page in a pooled browser.
+
+    search(query, n) is an async iterator of pin batches; every search backend exposes
+    the same interface so schedulers don't care how pins are found.
+    """
+
+    def __init__(self, pool=None, policy: Optional[ScrollPolicy] = None):
+        if pool is None:
+            from pinterest_browser import BrowserPool
+            pool = BrowserPool()
+        self.pool = pool
+        self.policy = policy
+
+    async def search(self, query: str, n: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        from pinterest_browser import is_webdriver_error
+
+        driver = await asyncio.to_thread(self.pool.acquire)
+        broken = False
+        try:
+            await asyncio.to_thread(driver.get, search_url(query))
+            # Close the scroller before the driver goes back to the pool, even when this
+            # generator is abandoned mid-search
+            scroller = scroll_pins_async(driver, n, policy=self.policy)
+            try:
+                async for batch in scroller:
+                    yield batch
+            finally:
+                await scroller.aclose()
+        except BaseException as e:
+            broken = is_webdriver_error(e)
+            raise
+        finally:
+            self.pool.release(driver, broken=broken)
+
+
+class HttpSearch:
+    """
+    Browserless search backend: pages through Pinterest's search resource JSON using
+    bookmarks, over the shared pooled aiohttp session. `base_url` can point at a local
+    stub server that replays recorded responses.
+    """
+
+    RESOURCE_PATH = "/resource/BaseSearchResource/get/"
+    END_BOOKMARK = "-end-"
+
+    def __init__(self, base_url: str = PIN_BASE_URL, scope: str = "videos", page_size: int = 25, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.scope = scope
+        self.page_size = page_size
+        self.session = session
+
+    def _params(self, query: str, bookmark: Optional[str]) -> Dict[str, str]:
+        options = {
+            "query": query,
+            "scope": self.scope,
+            "page_size": self.page_size,
+            "bookmarks": [bookmark] if bookmark else [],
+        }
+        return {
+            "source_url": f"/search/{self.scope}/?q={quote(query)}&rs=typed",
+            "data": json.dumps({"options": options, "context": {}}, separators=(",", ":")),
+        }
+
+    @staticmethod
+    def _results(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        data = (payload.get("resource_response") or {}).get("data")
+        if isinstance(data, dict):
+            data = data.get("results")
+        return data if isinstance(data, list) else []
+
+    @staticmethod
+    def _bookmark(payload: Dict[str, Any]) -> Optional[str]:
+        bookmark = (payload.get("resource_response") or {}).get("bookmark")
+        if not bookmark:
+            bookmarks = ((payload.get("resource") or {}).get("options") or {}).get("bookmarks") or []
+            bookmark = bookmarks[0] if bookmarks else None
+        return bookmark
+
+    async def search(self, query: str, n: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        from pinterest_http import fetch, get_session
+
+        session = self.session or await get_session()
+        headers = {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+            "X-Pinterest-PWS-Handler": "www/search/[scope].js",
+        }
+        url = f"{self.base_url}{self.RESOURCE_PATH}"
+        seen: Set[str] = set()
+        remaining = n
+        bookmark = None
+        while remaining > 0:
+            async with fetch(url, session=session, params=self._params(query, bookmark), headers=headers) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"Search resource returned HTTP {resp.status}")
+                payload = await resp.json(content_type=None)
+
+            results = self._results(payload)
+            batch = []
+            for item in results:
+                pin_id = str(item.get("id") or "")
+                if not pin_id.isdigit() or item.get("type", "pin") != "pin" or pin_id in seen:
+                    continue
+                seen.add(pin_id)
+                record = _pin_record(pin_id, f"/pin/{pin_id}/", item.get("title") or item.get("grid_title"))
+                record["description"] = item.get("description") or None
+                batch.append(record)
+            if batch:
+                batch = batch[:remaining]
+                remaining -= len(batch)
+                yield batch
+
+            bookmark = self._bookmark(payload)
+            if not results or not bookmark or bookmark == self.END_BOOKMARK:
+                return
+
+
+class FallbackSearch:
+    """
+    Try `primary` (e.g. HttpSearch) and switch to `fallback` (e.g. SeleniumSearch) only
+    when the primary fails or finds nothing. Pins already yielded are not repeated.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    async def search(self, query: str, n: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        seen: Set[str] = set()
+        failed = False
+
+        def fresh(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            out = [p for p in batch if p["pin_id"] not in seen][: n - len(seen)]
+            seen.update(p["pin_id"] for p in out)
+            return out
+
+        try:
+            async for batch in self.primary.search(query, n):
+                batch = fresh(batch)
+                if batch:
+                    yield batch
+        except Exception:
+            failed = True
+
+        if len(seen) >= n or (seen and not failed):
+            return
+        batches = self.fallback.search(query, n)
+        try:
+            async for batch in batches:
+                batch = fresh(batch)
+                if batch:
+                    yield batch
+                if len(seen) >= n:
+                    return
+        finally:
+            # Close promptly so a pooled browser goes back to its pool right away
+            await batches.aclose()
+
+
+SEARCH_BACKENDS = ("auto", "http", "selenium")
+
+
+def make_search_backend(kind: str = "auto", pool=None):
+    """
+    'http' = HttpSearch only, 'selenium' = SeleniumSearch only, 'auto' = HTTP first
+    with Selenium as the fallback (skipped when selenium is not installed).
+    """
+    if kind == "http":
+        return HttpSearch()
+    from pinterest_browser import selenium_available
+    if kind == "selenium":
+        return SeleniumSearch(pool)
+    if kind != "auto":
+        raise ValueError(f"Unknown search backend: {kind}")
+    if not selenium_available():
+        return HttpSearch()
+    return FallbackSearch(HttpSearch(), SeleniumSearch(pool))
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import shutil
+from typing import Optional
+
+# Blobs live next to the downloads so hardlinks stay on one filesystem:
+#   <save_location>/.store/ab/abcdef....jpg
+STORE_DIR = ".store"
+HASH_NAME = "sha256"
+READ_BLOCK = 1024 * 1024
+
+
+class StreamHash:
+    """Running digest of a download that survives resumes from a .part file."""
+
+    def __init__(self, name: str = HASH_NAME):
+        self.name = name
+        self.reset()
+
+    def reset(self) -> None:
+        self._h = hashlib.new(self.name)
+
+    def update(self, data: bytes) -> None:
+        self._h.update(data)
+
+    def catch_up(self, path: str) -> None:
+        """Restart the digest from the bytes already in `path` (before appending to it)."""
+        self.reset()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b""):
+                self._h.update(block)
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def link_file(src: str, dest: str) -> str:
+    """
+    Make `dest` refer to the same bytes as `src`: hardlink, else relative symlink, else
+    a copy. Any existing `dest` is replaced. Returns 'hardlink', 'symlink' or 'copy'.
+    """
+    tmp = f"{dest}.link"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+        kind = "hardlink"
+    except OSError:
+        try:
+            os.symlink(os.path.relpath(src, os.path.dirname(os.path.abspath(dest))), tmp)
+            kind = "symlink"
+        except OSError:
+            shutil.copyfile(src, tmp)
+            kind = "copy"
+    os.replace(tmp, dest)
+    return kind
+
+
+class MediaStore:
+    """
+    Content-addressed media under `<root>/.store`: each distinct file is kept once under
+    its digest and every per-pin filename is a link to it.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.join(root, STORE_DIR)
+
+    def blob_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def find(self, digest: str, ext: str, size: Optional[int] = None) -> Optional[str]:
+        """Path of the stored blob, if present (and of the expected size)."""
+        path = self.blob_path(digest, ext)
+        try:
+            if size is not None and os.path.getsize(path) != size:
+                return None
+        except OSError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def adopt(self, path: str, digest: str, ext: str) -> str:
+        """
+        Move a freshly downloaded file into the store, or drop it if the blob already
+        exists, and leave `path` as a link to the blob. Returns the blob path.
+        """
+        blob = self.blob_path(digest, ext)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if not os.path.exists(blob):
+            os.replace(path, blob)
+        link_file(blob, path)
+        return blob
+
+    def link(self, blob: str, dest: str) -> str:
+        """Point a per-pin filename at an existing blob (or any complete copy of it)."""
+        return link_file(blob, dest)
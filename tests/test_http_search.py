@@ -0,0 +1,158 @@
+"""
+HttpSearch and FallbackSearch against a local aiohttp stub that replays the recorded
+search-resource pages in tests/fixtures/search.
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_scraper import FallbackSearch, HttpSearch  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "search")
+
+# (query, bookmark sent) -> recorded page
+PAGES = {
+    ("cats", None): "cats_page1.json",
+    ("cats", "Y2JVSG81ZlpWQT09"): "cats_page2.json",
+    ("cats", "Y2JVSG82RlVhZz09"): "cats_page3.json",
+    ("nothing", None): "empty.json",
+}
+
+
+def _load(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubServer:
+    """Serves HttpSearch.RESOURCE_PATH from PAGES and records the bookmarks requested."""
+
+    def __init__(self):
+        self.requests = []
+        self._runner = None
+        self.base_url = None
+
+    async def _handle(self, request):
+        options = json.loads(request.query["data"])["options"]
+        bookmark = (options.get("bookmarks") or [None])[0]
+        self.requests.append((options["query"], bookmark))
+        name = PAGES.get((options["query"], bookmark))
+        if name is None:
+            return web.Response(status=404, text="not recorded")
+        return web.json_response(_load(name))
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get(HttpSearch.RESOURCE_PATH, self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+class FakeSearch:
+    """Backend that replays fixed batches, optionally raising after them."""
+
+    def __init__(self, batches, error=None):
+        self.batches = batches
+        self.error = error
+        self.calls = 0
+
+    async def search(self, query, n):
+        self.calls += 1
+        for batch in self.batches:
+            yield [dict(p) for p in batch]
+        if self.error:
+            raise self.error
+
+
+def _pins(*ids):
+    return [{"pin_id": str(i), "href": f"https://www.pinterest.com/pin/{i}/", "title": None} for i in ids]
+
+
+async def _collect(backend, query, n):
+    return [batch async for batch in backend.search(query, n)]
+
+
+def run_with_stub(test):
+    async def main():
+        async with StubServer() as stub, aiohttp.ClientSession() as session:
+            await test(stub, HttpSearch(base_url=stub.base_url, session=session))
+    asyncio.run(main())
+
+
+def test_pages_through_bookmarks_until_end():
+    async def test(stub, http):
+        batches = await _collect(http, "cats", 100)
+        pins = [p for batch in batches for p in batch]
+        assert [p["pin_id"] for p in pins] == [f"90000000000000000{i}" for i in range(1, 7)]
+        # Bookmarks from resource_response and from resource.options are both followed
+        assert stub.requests == [("cats", None), ("cats", "Y2JVSG81ZlpWQT09"), ("cats", "Y2JVSG82RlVhZz09")]
+        assert pins[0]["description"] == "A cat asleep in the sun"
+        assert pins[1]["title"] == "Kitten video" and pins[1]["description"] is None
+        assert pins[0]["href"] == "https://www.pinterest.com/pin/900000000000000001/"
+    run_with_stub(test)
+
+
+def test_stops_once_enough_pins_were_found():
+    async def test(stub, http):
+        batches = await _collect(http, "cats", 4)
+        assert sum(len(b) for b in batches) == 4
+        assert len(stub.requests) == 2
+    run_with_stub(test)
+
+
+def test_http_error_raises():
+    async def test(stub, http):
+        with pytest.raises(RuntimeError):
+            await _collect(http, "unrecorded", 10)
+    run_with_stub(test)
+
+
+def test_fallback_not_used_when_http_finds_pins():
+    async def test(stub, http):
+        fallback = FakeSearch([_pins(1, 2)])
+        batches = await _collect(FallbackSearch(http, fallback), "cats", 100)
+        assert sum(len(b) for b in batches) == 6
+        assert fallback.calls == 0
+    run_with_stub(test)
+
+
+def test_fallback_used_when_http_finds_nothing():
+    async def test(stub, http):
+        fallback = FakeSearch([_pins(7, 8)])
+        batches = await _collect(FallbackSearch(http, fallback), "nothing", 10)
+        assert [p["pin_id"] for b in batches for p in b] == ["7", "8"]
+        assert stub.requests == [("nothing", None)]
+    run_with_stub(test)
+
+
+def test_fallback_used_when_http_fails():
+    async def test(stub, http):
+        fallback = FakeSearch([_pins(7)])
+        batches = await _collect(FallbackSearch(http, fallback), "unrecorded", 10)
+        assert [p["pin_id"] for b in batches for p in b] == ["7"]
+    run_with_stub(test)
+
+
+def test_fallback_continues_after_partial_failure_without_repeats():
+    primary = FakeSearch([_pins(1, 2)], error=RuntimeError("blocked"))
+    fallback = FakeSearch([_pins(2, 3), _pins(4, 5)])
+    batches = asyncio.run(_collect(FallbackSearch(primary, fallback), "cats", 4))
+    assert [[p["pin_id"] for p in b] for b in batches] == [["1", "2"], ["3"], ["4"]]
@@ -0,0 +1,67 @@
+"""
+JobQueue leases: expiry, reclaim by another worker, and stale owners being locked out.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_db import JobQueue  # noqa: E402
+
+
+def _state(queue, job_id):
+    with queue._lock:
+        return queue.conn.execute(
+            "SELECT state, lease_owner, attempts FROM jobs WHERE id=?", (job_id,)
+        ).fetchone()
+
+
+def test_expired_lease_is_reclaimed_and_stale_owner_locked_out(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    with JobQueue(db, lease=0.3) as a, JobQueue(db, lease=30) as b:
+        a.enqueue(["111"], str(tmp_path))
+        job = a.claim()[0]
+        # Still leased by A: B can't take it
+        assert b.claim() == []
+
+        time.sleep(0.4)
+        reclaimed = b.claim()
+        assert [j["id"] for j in reclaimed] == [job["id"]]
+        assert reclaimed[0]["attempts"] == 2
+
+        # A's late results must not touch the job B is now working on
+        assert a.done(job["id"], "/tmp/late.jpg") is False
+        assert a.fail(job["id"], "late failure") is False
+        a.mark(job["id"], "downloading")
+        a.release([job["id"]])
+        state, owner, attempts = _state(b, job["id"])
+        assert (state, owner, attempts) == ("resolving", b.owner, 2)
+
+        assert b.done(job["id"], "/tmp/ok.jpg") is True
+        assert _state(b, job["id"])[0] == "done"
+
+
+def test_fail_requeues_until_attempts_are_used_up(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    with JobQueue(db, max_attempts=2) as q:
+        q.enqueue(["222"], str(tmp_path))
+        job = q.claim()[0]
+        assert q.fail(job["id"], "boom") is True
+        job = q.claim()[0]
+        assert q.fail(job["id"], "boom again") is False
+        assert _state(q, job["id"])[0] == "failed"
+        assert q.claim() == []
+
+
+def test_renew_keeps_lease_alive(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    with JobQueue(db, lease=0.3) as a, JobQueue(db) as b:
+        a.enqueue(["333"], str(tmp_path))
+        job = a.claim()[0]
+        for _ in range(3):
+            time.sleep(0.15)
+            a.renew([job["id"]])
+        assert b.claim() == []
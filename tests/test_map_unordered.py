@@ -0,0 +1,94 @@
+"""
+map_unordered: concurrency bound, backpressure on the producer, and error propagation.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_http import map_unordered  # noqa: E402
+
+
+def test_bounds_concurrency_and_pending_items():
+    running = peak = produced = consumed = 0
+    max_ahead = 0
+
+    async def items():
+        nonlocal produced, max_ahead
+        for i in range(20):
+            produced += 1
+            max_ahead = max(max_ahead, produced - consumed)
+            yield i
+
+    async def work(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return i * 2
+
+    async def main():
+        nonlocal consumed
+        out = []
+        async for res in map_unordered(items(), work, workers=3, max_pending=2):
+            consumed += 1
+            out.append(res)
+        return out
+
+    out = asyncio.run(main())
+    assert sorted(out) == [i * 2 for i in range(20)]
+    assert peak == 3
+    # At most: one item per worker, the queue, and the one the feeder is holding
+    assert max_ahead <= 3 + 2 + 1
+
+
+def test_accepts_plain_iterables():
+    async def double(i):
+        return i * 2
+
+    async def main():
+        return [res async for res in map_unordered(range(5), double, workers=2)]
+
+    assert sorted(asyncio.run(main())) == [0, 2, 4, 6, 8]
+
+
+def test_worker_error_propagates_and_cancels_the_rest():
+    cancelled = []
+
+    async def work(i):
+        if i == 0:
+            raise ValueError("boom")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+
+    async def main():
+        async for _ in map_unordered(range(6), work, workers=3):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+    assert cancelled
+
+
+def test_producer_error_propagates():
+    async def items():
+        yield 1
+        raise RuntimeError("producer failed")
+
+    async def work(i):
+        return i
+
+    async def main():
+        return [res async for res in map_unordered(items(), work, workers=2)]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+PinStore's background writer when another connection holds the write lock.
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_db import PinStore, fetch_pins_by_pin_id  # noqa: E402
+
+
+@pytest.fixture
+def short_timeouts(monkeypatch):
+    monkeypatch.setattr(PinStore, "BUSY_TIMEOUT", 0.1)
+    monkeypatch.setattr(PinStore, "WRITER_INTERVAL", 0.01)
+
+
+def _hold_write_lock(db):
+    conn = sqlite3.connect(db, isolation_level=None, check_same_thread=False)
+    conn.execute("BEGIN IMMEDIATE")
+    return conn
+
+
+def test_queued_writes_wait_for_a_busy_database(tmp_path, short_timeouts):
+    db = str(tmp_path / "pins.db")
+    store = PinStore(db)
+    blocker = _hold_write_lock(db)
+    store.enqueue_upsert({"pin_id": "1", "href": "h", "file_path": "/tmp/x.jpg"})
+    # Let go while the writer is backing off
+    threading.Timer(0.3, lambda: (blocker.execute("COMMIT"), blocker.close())).start()
+    store.close()
+    assert fetch_pins_by_pin_id(["1"], db_path=db)[0][1] == "1"
+
+
+def test_failed_writes_are_reported(tmp_path, short_timeouts):
+    db = str(tmp_path / "pins.db")
+    store = PinStore(db)
+    blocker = _hold_write_lock(db)
+    try:
+        store.enqueue_upsert({"pin_id": "2", "href": "h"})
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush()
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    # The error is reported once; later writes go through
+    store.enqueue_upsert({"pin_id": "3", "href": "h"})
+    store.close()
+    assert [r[1] for r in fetch_pins_by_pin_id(["2", "3"], db_path=db)] == ["3"]
@@ -0,0 +1,88 @@
+"""
+download_file resuming from a .part file against a local aiohttp stub.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pinterest_http  # noqa: E402
+from code_download import download_file  # noqa: E402
+from pinterest_http import RetryPolicy  # noqa: E402
+
+BODY = bytes(range(256)) * 400
+CUT = 40000
+
+
+async def _serve(handler, fn):
+    app = web.Application()
+    app.router.add_get("/media.mp4", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await fn(f"http://127.0.0.1:{port}/media.mp4")
+    finally:
+        await pinterest_http.close_session()
+        await runner.cleanup()
+
+
+def _download(tmp_path, handler):
+    path = str(tmp_path / "media.mp4")
+    policy = RetryPolicy(attempts=4, base_delay=0.01)
+    ok = asyncio.run(_serve(handler, lambda url: download_file(url, path, policy=policy)))
+    return ok, path
+
+
+def _range_handler(content_range_start):
+    """First response breaks off after CUT bytes; Range requests are answered from `content_range_start(offset)`."""
+    ranges = []
+
+    async def handler(request):
+        rng = request.headers.get("Range")
+        ranges.append(rng)
+        if len(ranges) == 1:
+            resp = web.StreamResponse(headers={"ETag": '"v1"', "Content-Length": str(len(BODY))})
+            await resp.prepare(request)
+            await resp.write(BODY[:CUT])
+            request.transport.close()
+            return resp
+        if not rng:
+            return web.Response(body=BODY, headers={"ETag": '"v1"'})
+        start = content_range_start(int(rng[len("bytes="):-1]))
+        return web.Response(
+            status=206, body=BODY[start:],
+            headers={"ETag": '"v1"', "Content-Range": f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"},
+        )
+
+    return handler, ranges
+
+
+def test_resumes_from_the_part_file(tmp_path):
+    handler, ranges = _range_handler(lambda offset: offset)
+    ok, path = _download(tmp_path, handler)
+    assert ok
+    assert ranges == [None, f"bytes={CUT}-"]
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+
+
+def test_misaligned_range_restarts_instead_of_appending(tmp_path):
+    # The server ignores the requested offset and sends the range from a few KB earlier
+    handler, ranges = _range_handler(lambda offset: offset - 4096)
+    ok, path = _download(tmp_path, handler)
+    assert ok
+    assert ranges == [None, f"bytes={CUT}-", None]
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    assert not os.path.exists(path + ".part")